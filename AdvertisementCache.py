@@ -0,0 +1,105 @@
+from bisect import bisect_left
+
+from RIPCodec import *
+
+
+class AdvertisementCache:
+    """
+        Keeps the encoded RIP packets for every neighbour ready to send, only re-encoding the entries of routes that have changed
+    """
+    def __init__(self, router_id, output_links, routing_table):
+        """
+            Initializes the cache for the given router and registers it for changes to the routing table
+            :param router_id: the id of the router the packets are being sent from
+            :param output_links: OutputLinks object of the neighbours to advertise to
+            :param routing_table: RoutingTable object holding the routes to advertise
+        """
+        self.header = encode_header(router_id)
+        self.routing_table = routing_table
+        self.destinations = [] # Sorted list of the destinations that are being advertised
+        self.pending = set() # Destinations whose entries need to be re-encoded
+        self.reset_links(output_links)
+        routing_table.add_change_listener(self.invalidate)
+
+    def reset_links(self, output_links):
+        """
+            Rebuilds the cache from scratch for the given output links
+        """
+        self.neighbours = [(link.port, link.router_id) for link in output_links.links]
+        self.entries = {port: [] for port, _ in self.neighbours} # Encoded entries for each port, in the same order as self.destinations
+        self.packets = {port: None for port, _ in self.neighbours} # Joined packets for each port, None when they need rebuilding
+        self.destinations = []
+        self.pending = {route.destination for route in self.routing_table.routes}
+
+    def invalidate(self, destination):
+        """
+            Marks the entries for the given destination as needing to be re-encoded
+        """
+        self.pending.add(destination)
+
+    def apply_pending(self):
+        """
+            Re-encodes the entries of every route that has changed since the last time the packets were requested
+        """
+        if not self.pending:
+            return
+        for destination in self.pending:
+            route = self.routing_table.get_route_by_router(destination)
+            index = bisect_left(self.destinations, destination)
+            known = index < len(self.destinations) and self.destinations[index] == destination
+
+            if route is None:
+                if known:
+                    del self.destinations[index]
+                    for entries in self.entries.values():
+                        del entries[index]
+                continue
+
+            flap_damping = self.routing_table.flap_damping
+            if flap_damping is not None and flap_damping.is_suppressed(destination):
+                entry = encode_entry(destination, 16) # Suppressed routes are advertised as unreachable until they are reused
+            else:
+                entry = encode_entry(destination, route.metric)
+            # Split horizon with poisoned reverse: every neighbour that is one of the route's next hops gets the route
+            # at infinity, except a neighbour that is the destination itself
+            next_hops = route.next_hops
+            poisoned = encode_entry(destination, 16)
+            if not known:
+                self.destinations.insert(index, destination)
+            for port, neighbour_id in self.neighbours:
+                port_entry = poisoned if neighbour_id in next_hops and neighbour_id != destination else entry
+                if known:
+                    self.entries[port][index] = port_entry
+                else:
+                    self.entries[port].insert(index, port_entry)
+
+        self.pending.clear()
+        for port in self.packets:
+            self.packets[port] = None
+
+    def get_packets(self, port):
+        """
+            Returns the list of encoded RIP packets to send to the neighbour on the given port
+        """
+        self.apply_pending()
+        packets = self.packets[port]
+        if packets is None:
+            packets = self.packets[port] = join_entries(self.header, self.entries[port])
+        return packets
+
+    def get_delta_packets(self, port, destinations):
+        """
+            Returns the list of encoded RIP packets holding only the given destinations for the neighbour on the given port.
+            Destinations that are no longer in the routing table are left out. Returns an empty list if there is nothing to send
+            :param destinations: sorted list of destination router ids
+        """
+        self.apply_pending()
+        entries = self.entries[port]
+        encoded_entries = []
+        for destination in destinations:
+            index = bisect_left(self.destinations, destination)
+            if index < len(self.destinations) and self.destinations[index] == destination:
+                encoded_entries.append(entries[index])
+        if not encoded_entries:
+            return []
+        return join_entries(self.header, encoded_entries)
@@ -0,0 +1,258 @@
+import asyncio
+import signal
+import time
+
+
+class RIPDatagramProtocol(asyncio.DatagramProtocol):
+    """
+        Datagram protocol for a single input port that hands every received packet straight to the engine
+    """
+    def __init__(self, engine, port):
+        """
+            Initializes the protocol for the given engine and input port
+        """
+        self.engine = engine
+        self.port = port
+
+    def datagram_received(self, data, addr):
+        """
+            Called by the event loop as soon as a packet arrives on the input port
+        """
+        self.engine.packet_received(data, self.port)
+
+
+class AsyncEngine:
+    """
+        Event driven alternative to Daemon.run_rip_daemon. Packets are processed as soon as they arrive and the
+        periodic, timeout and garbage collection timers fire at their exact deadlines using loop.call_at
+    """
+    def __init__(self, daemon):
+        """
+            Initializes the engine for the given daemon
+            :param daemon: Daemon object to run
+        """
+        self.daemon = daemon
+        self.loop = None
+        self.transports = {} # Datagram transport of each input socket
+        self.periodic_handle = None
+        self.hello_handle = None
+        self.route_timer_handle = None
+        self.route_timer_deadline = None
+        self.redraw_handle = None
+        self.triggered_handle = None
+        self.triggered_deadline = None
+        self.profiler_handle = None
+        self.snapshot_handle = None
+
+    def run(self):
+        """
+            Runs the daemon until it is interrupted
+        """
+        asyncio.run(self.main())
+
+    async def main(self):
+        """
+            Sets up a datagram endpoint on every input socket, sends the initial updates then starts the timers
+        """
+        self.loop = asyncio.get_running_loop()
+        self.stopped = self.loop.create_future()
+        for port, input_socket in zip(self.daemon.input_ports, self.daemon.input_sockets):
+            input_socket.setblocking(False)
+            transport, _ = await self.loop.create_datagram_endpoint(lambda port=port: RIPDatagramProtocol(self, port), sock=input_socket)
+            self.transports[input_socket] = transport
+
+        if self.daemon.stats_server is not None:
+            self.daemon.stats_server.set_loop(self.loop)
+            self.loop.add_reader(self.daemon.stats_server.fileno(), self.daemon.stats_server.handle)
+        self.loop.add_signal_handler(signal.SIGHUP, self.reload)
+        self.daemon.send_startup_packets()
+        self.daemon.reset_periodic_update_timer()
+        self.schedule_periodic_update()
+        self.schedule_hello()
+        self.schedule_route_timers()
+        self.redraw()
+        if self.daemon.profiler is not None:
+            self.profiler_tick()
+        if self.daemon.snapshot_file is not None:
+            self.schedule_snapshot()
+        try:
+            await self.stopped
+        finally:
+            self.cancel_timers()
+
+    def stop(self):
+        """
+            Makes the engine return from run
+        """
+        if not self.stopped.done():
+            self.stopped.set_result(None)
+
+    def to_loop_time(self, deadline):
+        """
+            Converts a deadline of the daemon's timers into the event loop's time
+        """
+        return self.loop.time() + (deadline - self.daemon.clock.now())
+
+    def packet_received(self, data, port):
+        """
+            Processes a packet then makes sure the route timers will fire in time for any routes it added
+        """
+        start = time.perf_counter()
+        self.daemon.handle_packet(data, port)
+        self.schedule_route_timers()
+        self.schedule_triggered_update()
+        self.daemon.stats.loop_finished(time.perf_counter() - start)
+
+    def schedule_periodic_update(self):
+        """
+            Schedules the next periodic update at the deadline of the daemon's periodic update timer
+        """
+        self.periodic_handle = self.loop.call_at(self.to_loop_time(self.daemon.get_periodic_update_deadline()), self.periodic_update)
+
+    def periodic_update(self):
+        """
+            Sends a periodic update and schedules the next one
+        """
+        self.daemon.check_periodic_update_timer()
+        self.schedule_periodic_update()
+
+    def schedule_hello(self):
+        """
+            Schedules the next hello in fast hello mode
+        """
+        deadline = self.daemon.get_hello_deadline()
+        if deadline is not None:
+            self.hello_handle = self.loop.call_at(self.to_loop_time(deadline), self.hello)
+
+    def hello(self):
+        """
+            Sends a hello to every neighbour and schedules the next one
+        """
+        self.daemon.check_hello_timer()
+        self.schedule_hello()
+
+    def schedule_route_timers(self):
+        """
+            Schedules a route timer check at the earliest route or neighbour liveness deadline, unless one is already
+            scheduled before it
+        """
+        deadline = self.daemon.get_route_timer_deadline()
+        if deadline is None:
+            return
+        if self.route_timer_handle is not None:
+            if self.route_timer_deadline <= deadline:
+                return
+            self.route_timer_handle.cancel()
+        self.route_timer_deadline = deadline
+        self.route_timer_handle = self.loop.call_at(self.to_loop_time(deadline), self.route_timers_expired)
+
+    def route_timers_expired(self):
+        """
+            Checks the timers of the routes whose deadline has passed, then schedules the next check
+        """
+        self.route_timer_handle = None
+        self.daemon.check_route_timers()
+        self.schedule_route_timers()
+        self.schedule_triggered_update()
+
+    def schedule_triggered_update(self):
+        """
+            Schedules the pending triggered update at the end of its hold down, unless it is already scheduled for then.
+            An immediate update can bring the deadline forward, in which case it is scheduled again
+        """
+        deadline = self.daemon.triggered_updates.deadline
+        if deadline is None:
+            return
+        if self.triggered_handle is not None:
+            if deadline >= self.triggered_deadline:
+                return
+            self.triggered_handle.cancel()
+        self.triggered_deadline = deadline
+        self.triggered_handle = self.loop.call_at(self.to_loop_time(deadline), self.triggered_update)
+
+    def triggered_update(self):
+        """
+            Sends the pending triggered update once its hold down has expired
+        """
+        self.triggered_handle = None
+        self.daemon.check_triggered_update_timer()
+        self.schedule_triggered_update()
+
+    def redraw(self):
+        """
+            Updates the daemon's display and schedules the next update, unless the display is headless
+        """
+        display = self.daemon.display
+        display.update()
+        if display.refresh_interval is not None:
+            self.redraw_handle = self.loop.call_later(display.refresh_interval, self.redraw)
+
+    def profiler_tick(self):
+        """
+            Lets the profiler open or close its cProfile window, then schedules the next check a second later
+        """
+        self.daemon.profiler.tick()
+        self.profiler_handle = self.loop.call_later(1, self.profiler_tick)
+
+    def reload(self):
+        """
+            Re-reads the daemon's config on SIGHUP, then sets up datagram endpoints for the input sockets that were
+            opened and drops the ones for sockets that were closed
+        """
+        self.daemon.request_reload()
+        self.daemon.check_reload()
+        for input_socket in list(self.transports):
+            if input_socket not in self.daemon.input_socket_ports:
+                transport = self.transports.pop(input_socket)
+                if transport is not None: # None while its endpoint is still being set up, see add_endpoint
+                    transport.abort()
+        for input_socket, port in self.daemon.input_socket_ports.items():
+            if input_socket not in self.transports:
+                self.transports[input_socket] = None # Claimed so a second reload doesn't add it again
+                self.loop.create_task(self.add_endpoint(input_socket, port))
+        self.schedule_route_timers()
+        self.schedule_triggered_update()
+
+    async def add_endpoint(self, input_socket, port):
+        """
+            Sets up a datagram endpoint for an input socket opened after the engine started. If another reload closes
+            the socket before the endpoint is ready, the endpoint is dropped
+        """
+        try:
+            transport, _ = await self.loop.create_datagram_endpoint(lambda: RIPDatagramProtocol(self, port), sock=input_socket)
+        except OSError:
+            self.transports.pop(input_socket, None)
+            return
+        if input_socket not in self.transports:
+            transport.abort()
+            return
+        self.transports[input_socket] = transport
+
+    def schedule_snapshot(self):
+        """
+            Schedules the next snapshot of the routing table
+        """
+        self.snapshot_handle = self.loop.call_later(self.daemon.snapshot_interval, self.snapshot)
+
+    def snapshot(self):
+        """
+            Saves a snapshot of the routing table then schedules the next one
+        """
+        self.daemon.save_snapshot()
+        self.schedule_snapshot()
+
+    def cancel_timers(self):
+        """
+            Cancels the scheduled timers and closes the datagram transports
+        """
+        for handle in (self.periodic_handle, self.hello_handle, self.route_timer_handle, self.redraw_handle, self.triggered_handle, self.profiler_handle, self.snapshot_handle):
+            if handle is not None:
+                handle.cancel()
+        for transport in self.transports.values():
+            if transport is not None:
+                transport.close()
+        self.transports.clear()
+        self.loop.remove_signal_handler(signal.SIGHUP)
+        if self.daemon.stats_server is not None:
+            self.loop.remove_reader(self.daemon.stats_server.fileno())
+            self.daemon.stats_server.set_loop(None)
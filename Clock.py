@@ -0,0 +1,44 @@
+import time
+
+
+class MonotonicClock:
+    """Clock that reads the system's monotonic time, used by the daemon when running for real"""
+    def now(self):
+        """
+            Returns the current time in seconds
+        """
+        return time.monotonic()
+
+
+class VirtualClock:
+    """
+        Clock that only moves when it is told to, so simulations can jump straight to the next timer deadline
+        instead of waiting for it in real time
+    """
+    def __init__(self, start=0.0):
+        """
+            Initializes the clock at the given time in seconds
+        """
+        self.time = start
+
+    def now(self):
+        """
+            Returns the current virtual time in seconds
+        """
+        return self.time
+
+    def advance(self, seconds):
+        """
+            Moves the clock forward by the given number of seconds
+        """
+        self.time += seconds
+
+    def advance_to(self, deadline):
+        """
+            Moves the clock forward to the given time. The clock never moves backwards
+        """
+        if deadline > self.time:
+            self.time = deadline
+
+
+SYSTEM_CLOCK = MonotonicClock()
@@ -0,0 +1,87 @@
+import random
+import sys
+import timeit
+
+from RIPPacket import *
+from RIPCodec import *
+
+
+def legacy_encode(src_id, entries):
+    """
+        Encodes the entries the way the daemon used to, one RIPPacket per 25 entries
+    """
+    packets = []
+    for i in range(0, len(entries), MAX_ENTRIES):
+        message = RIPPacket(src_id)
+        for router_id, metric in entries[i:i + MAX_ENTRIES]:
+            message.append_entry(router_id, metric)
+        packets.append(bytes(message.packet))
+    return packets
+
+
+def legacy_decode(packets):
+    """
+        Decodes the packets the way the daemon used to, by slicing every entry out of the packet
+    """
+    total = 0
+    for data in packets:
+        rip_data = data[4:]
+        for i in range(0, int(len(rip_data)), 20):
+            route = rip_data[i:i + 20]
+            int.from_bytes(route[:2], 'big')
+            int.from_bytes(route[4:8], 'big')
+            int.from_bytes(route[16:], 'big')
+            total += 1
+    return total
+
+
+def codec_decode(packets):
+    """
+        Decodes the packets with the precompiled struct layouts in RIPCodec
+    """
+    total = 0
+    for data in packets:
+        decode_header(data)
+        for _ in iter_entries(data):
+            total += 1
+    return total
+
+
+def decoded_entries(packets):
+    """
+        Returns the (router id, metric) of every entry in the packets, in order
+    """
+    return [(router_id, metric) for data in packets for _, _, router_id, metric in iter_entries(data)]
+
+
+def benchmark(name, function, entry_count, repeat):
+    """
+        Times the given function and prints how many entries per second it handles
+    """
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    print(f"{name:<16} {entry_count / best:>14,.0f} entries/s")
+
+
+def main(entry_count=1000, repeat=20):
+    """
+        Runs the encode and decode micro-benchmarks over a table with the given number of entries
+    """
+    entries = [(router_id, random.randint(1, 16)) for router_id in random.sample(range(1, 64001), entry_count)]
+    packets = encode_packets(1, entries)
+    # Compared by their entries, as the codec sends a header-only packet for an empty table where the legacy path sent none
+    assert decoded_entries(packets) == decoded_entries(legacy_encode(1, entries)) == entries
+
+    print(f"{entry_count} entries in {len(packets)} packets, best of {repeat} runs")
+    benchmark("legacy encode", lambda: legacy_encode(1, entries), entry_count, repeat)
+    benchmark("codec encode", lambda: encode_packets(1, entries), entry_count, repeat)
+    benchmark("legacy decode", lambda: legacy_decode(packets), entry_count, repeat)
+    benchmark("codec decode", lambda: codec_decode(packets), entry_count, repeat)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("Usage: python CodecBenchmark.py [number of entries]")
+    elif len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
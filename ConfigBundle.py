@@ -0,0 +1,139 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+from ConfigParser import *
+
+
+class ConfigBundle:
+    """
+        The configs of a whole network of routers, read from a directory of config files or from bundle files holding
+        many routers' configs one after another, each starting with its router-id line. Every router is parsed by
+        ConfigParser, then the configs are checked against each other. Everything is done in time linear in the total
+        number of lines
+    """
+    def __init__(self):
+        """
+            Initializes an empty bundle
+        """
+        self.routers = {} # Input ports and OutputLinks of each router id
+        self.sources = {} # Where each router's config was read from
+        self.errors = [] # Configs that couldn't be parsed, and routers configured more than once
+
+    def load(self, paths):
+        """
+            Reads every config in the given files and directories of config files
+        """
+        for path in paths:
+            if os.path.isdir(path):
+                for filename in sorted(glob.glob(os.path.join(path, "*.txt"))):
+                    self.load_file(filename)
+            else:
+                self.load_bundle(path)
+
+    def load_file(self, filename):
+        """
+            Reads a config file holding a single router's config
+        """
+        with open(filename, 'r') as config_file:
+            self.add_config(config_file.read().splitlines(), filename, 1)
+
+    def load_bundle(self, filename):
+        """
+            Reads a file holding one or more routers' configs, splitting it at every router-id line
+        """
+        with open(filename, 'r') as bundle_file:
+            lines = bundle_file.read().splitlines()
+        start = 0
+        has_config = False
+        for line_num, line in enumerate(lines):
+            line = line.split('#', 1)[0].strip()
+            if line.startswith('router-id') and has_config:
+                self.add_config(lines[start:line_num], filename, start + 1)
+                start = line_num
+                has_config = False
+            has_config = has_config or line != ''
+        if has_config or start == 0:
+            self.add_config(lines[start:], filename, start + 1)
+
+    def add_config(self, config, filename, first_line):
+        """
+            Parses a single router's config. If it is invalid the error is recorded instead of raised, so every
+            problem in the bundle is reported at once
+        """
+        source = f"{filename}:{first_line}"
+        try:
+            router_id, input_ports, output_links = ConfigParser().read_config_lines(config, first_line)
+        except Exception as exception:
+            self.errors.append(f"{source}: {exception}")
+            return
+        if router_id in self.routers:
+            self.errors.append(f"{source}: Error: Router id {router_id} is already configured at {self.sources[router_id]}")
+            return
+        self.routers[router_id] = (input_ports, output_links)
+        self.sources[router_id] = source
+
+    def validate(self):
+        """
+            Checks the routers' configs against each other
+            :return: list of problems, each a readable string
+        """
+        problems = list(self.errors)
+
+        # Router listening on each input port, with any port claimed by more than one router reported
+        listeners = {}
+        for router_id, (input_ports, _) in self.routers.items():
+            for port in input_ports:
+                if port in listeners:
+                    problems.append(f"{self.sources[router_id]}: Router {router_id} and router {listeners[port]} both listen on port {port}")
+                else:
+                    listeners[port] = router_id
+
+        # Metric each router gives the link to each of its neighbours
+        link_metrics = {}
+        for router_id, (_, output_links) in self.routers.items():
+            for link in output_links.links:
+                link_metrics[(router_id, link.router_id)] = link.metric
+
+        for router_id, (_, output_links) in self.routers.items():
+            source = self.sources[router_id]
+            for link in output_links.links:
+                listener = listeners.get(link.port)
+                if listener is None:
+                    problems.append(f"{source}: Router {router_id} sends to port {link.port} for router {link.router_id}, but no router listens on it")
+                elif listener != link.router_id:
+                    problems.append(f"{source}: Router {router_id} sends to port {link.port} for router {link.router_id}, but router {listener} listens on it")
+
+                if link.router_id not in self.routers:
+                    problems.append(f"{source}: Router {router_id} has a link to router {link.router_id}, which isn't configured")
+                    continue
+                return_metric = link_metrics.get((link.router_id, router_id))
+                if return_metric is None:
+                    problems.append(f"{source}: Router {router_id} has a link to router {link.router_id}, but router {link.router_id} has no link back")
+                elif return_metric != link.metric and router_id < link.router_id: # Reported once per link
+                    problems.append(f"{source}: Router {router_id} gives its link to router {link.router_id} metric {link.metric}, "
+                                    f"but router {link.router_id} gives it metric {return_metric}")
+        return problems
+
+
+def main(arguments):
+    """
+        Loads and validates the given config files, directories and bundles, printing every problem found
+    """
+    start = time.perf_counter()
+    bundle = ConfigBundle()
+    bundle.load(arguments.paths)
+    problems = bundle.validate()
+    elapsed = time.perf_counter() - start
+    for problem in problems:
+        print(problem)
+    print(f"Validated {len(bundle.routers)} routers in {elapsed * 1000:.1f}ms: {len(problems)} problems", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loads the configs of a whole network and checks them against each other")
+    parser.add_argument("paths", nargs="+", help="directories of config files, or bundle files of one or more routers' configs")
+    sys.exit(main(parser.parse_args()))
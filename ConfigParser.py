@@ -4,27 +4,27 @@ from OutputLinks import *
 
 class ConfigParser:
     """Class that reads and parses config files"""
-    INPUT_PORTS = []
-    OUTPUT_LINKS = OutputLinks()
-    ROUTER_ID = None
-    def parse_config_file(self, config):
+    def __init__(self):
+        """
+            Initializes the parser with no config read yet. These are instance attributes so that several parsers
+            in the same process don't share the ports and links of the first router read
+        """
+        self.INPUT_PORTS = []
+        self.OUTPUT_LINKS = OutputLinks()
+        self.ROUTER_ID = None
+
+    def parse_config_file(self, config, first_line=1):
         """
             Parse the given config file by removing whitespace and ignoring comments
+            :param first_line: line number of the first line, for configs that are part of a larger file
         """
         checked_config = []
 
-        for line_num in range(len(config)):
-            
-            # Remove any comments from lines
-            for i in range(len(config[line_num])):
-                if config[line_num][i] == '#':
-                    config[line_num] = config[line_num][:i]
-                    break
-
-            config[line_num] = config[line_num].strip() # Remove leading and trailing whitespace
+        for line_num, line in enumerate(config, first_line):
+            line = line.split('#', 1)[0].strip() # Remove any comments, then leading and trailing whitespace
 
-            if config[line_num] != '': # If line isn't empty
-                checked_config.append([config[line_num], line_num + 1])
+            if line != '': # If line isn't empty
+                checked_config.append([line, line_num])
 
         return checked_config
 
@@ -77,6 +77,7 @@ class ConfigParser:
         """
         # Check at least two values on input port line (header and one input port)
         if len(input_ports_data) >= 2:
+            port_indexes = {} # Position of each port already read, to find duplicates
             try:
                 for port_index in range(1, len(input_ports_data)):
                     # Check port number is an integer in the correct range
@@ -84,10 +85,10 @@ class ConfigParser:
                     if port < 1024 or port > 64000:
                         raise Exception(f"Error: Invalid format on config line {input_ports_line}. Port number {port_index} must be an integer between 1024 and 64000.")
                     else:
-                        if port in self.INPUT_PORTS: # If port number is duplicated
-                            repeated_port_index = self.INPUT_PORTS.index(port) + 1
-                            raise Exception(f"Error: Invalid format on config line {input_ports_line}. Port numbers {repeated_port_index} and {port_index} are duplicates." )
+                        if port in port_indexes: # If port number is duplicated
+                            raise Exception(f"Error: Invalid format on config line {input_ports_line}. Port numbers {port_indexes[port]} and {port_index} are duplicates." )
                         else:
+                            port_indexes[port] = port_index
                             self.INPUT_PORTS.append(port)
             except ValueError: 
                 raise Exception(f"Error: Invalid format on config line {input_ports_line}. Port number {port_index} must be an integer.")
@@ -101,6 +102,8 @@ class ConfigParser:
         """
             # Check at least two values on output port line (header and one output port)
         if len(outputs_data) >= 2:
+            port_indexes = {} # Position of each output port already read, to find duplicates
+            input_port_indexes = {port: index + 1 for index, port in enumerate(self.INPUT_PORTS)}
             for port_index in range(1, len(outputs_data)):
                 port_data = outputs_data[port_index].split("-")
 
@@ -110,6 +113,9 @@ class ConfigParser:
                 except Exception as e: 
                     raise Exception(f"Error: Invalid format on config line {outputs_line}. Metric for port number {port_index} must be an integer.")
 
+                if metric < 1 or metric > 16:
+                    raise Exception(f"Error: Invalid format on config line {outputs_line}. Metric for port number {port_index} must be an integer between 1 and 16.")
+
                 # Check the outbound router id is valid
                 try:
                     router_id = int(port_data[2])
@@ -129,15 +135,14 @@ class ConfigParser:
                     raise Exception(f"Error: Invalid format on config line {outputs_line}. Port number {port_index} must be an integer between 1024 and 64000.")
 
                 else:
-                    if port in self.OUTPUT_LINKS.get_ports_list(): # If port number is duplicated
-                        repeated_port_index = list(self.OUTPUT_LINKS.get_ports_list()).index(port) + 1
-                        raise Exception(f"Error: Invalid format on config line {outputs_line}. Port numbers {repeated_port_index} and {port_index} are duplicates." )
+                    if port in port_indexes: # If port number is duplicated
+                        raise Exception(f"Error: Invalid format on config line {outputs_line}. Port numbers {port_indexes[port]} and {port_index} are duplicates." )
 
-                    elif port in self.INPUT_PORTS: # If an output port is also listed as an input port
-                        input_port_index = self.INPUT_PORTS.index(port) + 1
-                        raise Exception(f"Error: Invalid format on config line {outputs_line}. Output port {port_index} and input port {input_port_index} are duplicates." )
+                    elif port in input_port_indexes: # If an output port is also listed as an input port
+                        raise Exception(f"Error: Invalid format on config line {outputs_line}. Output port {port_index} and input port {input_port_indexes[port]} are duplicates." )
 
                     else:
+                        port_indexes[port] = port_index
                         self.OUTPUT_LINKS.add_link(port, metric, router_id)
         else:
             raise Exception(f"Error: Invalid format on config line {outputs_line}. Correct format is 'input-ports, {{integer between 1024 and 64000}}-{{link metric}}-{{router id}}'")
@@ -156,7 +161,14 @@ class ConfigParser:
             else:
                 raise Exception("Error: Config file must not be empty")
 
-        checked_config = self.parse_config_file(config)
+        return self.read_config_lines(config)
+
+    def read_config_lines(self, config, first_line=1):
+        """
+            Check that the contents of a config, given as a list of lines, are valid
+            :param first_line: line number of the first line, for configs that are part of a larger file
+        """
+        checked_config = self.parse_config_file(config, first_line)
 
         for i in range(len(checked_config)):
             checked_config[i][0] = checked_config[i][0].split(', ')
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from Simulator import *
+from Topology import *
+
+SCENARIOS = ["cold_start", "link_failure", "router_death", "cold_restart", "warm_restart", "link_flap"]
+FLAPS = 4 # Times the link is brought down and up again in the link_flap scenario
+FLAP_DOWN_TIME = 40 # Seconds the link stays down each time, long enough for the routes over it to time out
+FLAP_UP_TIME = 20 # Seconds the link stays up between flaps
+
+
+def table_matches(daemon, expected):
+    """
+        Checks if the daemon's routing table holds exactly the expected reachable destinations and metrics, and has
+        no routes restored from a snapshot still waiting to be confirmed by a neighbour
+    """
+    if daemon.routing_table.store.provisional:
+        return False
+    reachable = {route.destination: route.metric for route in daemon.routing_table.routes if route.metric < INFINITY}
+    return reachable == expected.get(daemon.router_id, {})
+
+
+def tables_match(simulator, expected):
+    """
+        Checks if every router's routing table matches the expected metrics
+    """
+    return all(table_matches(daemon, expected) for daemon in simulator.daemons.values())
+
+
+def measure_convergence(simulator, expected, timeout, tick):
+    """
+        Steps the simulation until the routing tables match the expected metrics or the timeout runs out
+        :return: dictionary of the convergence time and the packets, bytes and CPU time used on the way
+    """
+    network = simulator.network
+    packets_before = sum(network.sent_packets.values())
+    bytes_before = sum(network.sent_bytes.values())
+    simulator.measure_cpu_time()
+    start = simulator.clock.now()
+    wall_start = time.perf_counter()
+    converged = False
+    while simulator.clock.now() - start < timeout:
+        simulator.step()
+        if tables_match(simulator, expected):
+            converged = True
+            break
+        if simulator.is_virtual():
+            simulator.advance(start + timeout)
+        else:
+            time.sleep(tick)
+
+    cpu_times = list(network.cpu_time.values())
+    return {
+        "converged": converged,
+        "convergence_time": simulator.clock.now() - start if converged else None,
+        "wall_time": time.perf_counter() - wall_start,
+        "packets_sent": sum(network.sent_packets.values()) - packets_before,
+        "bytes_sent": sum(network.sent_bytes.values()) - bytes_before,
+        "cpu_time_per_router_mean": sum(cpu_times) / len(cpu_times) if cpu_times else 0,
+        "cpu_time_per_router_max": max(cpu_times) if cpu_times else 0,
+    }
+
+
+def run_scenario(topology, scenario, timeout, tick, real_time=False, max_paths=1, flap_damping=None, hello_interval=None):
+    """
+        Runs a single scenario on the given topology. Failure scenarios first wait for a cold start to converge,
+        then fail a link or router in the middle of the topology and measure how long the network takes to converge again.
+        Restart scenarios kill the router in the middle and start it again straight away, either with an empty table or
+        from a snapshot of its table taken just before. The link flap scenario brings the link in the middle down and up
+        a few times, then measures how long the network takes to converge once it stays up
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        simulator = Simulator(topology.write_configs(directory), None if real_time else VirtualClock(), max_paths=max_paths, flap_damping=flap_damping,
+                              hello_interval=hello_interval)
+        try:
+            simulator.start()
+            result = measure_convergence(simulator, topology.expected_metrics(), timeout, tick)
+            if scenario != "cold_start" and result["converged"]:
+                if scenario in ("cold_restart", "warm_restart"):
+                    restarted_router = topology.routers[len(topology.routers) // 2]
+                    snapshot_file = None
+                    if scenario == "warm_restart":
+                        snapshot_file = os.path.join(directory, "snapshot.bin")
+                        simulator.daemons[restarted_router].snapshot_file = snapshot_file
+                        simulator.daemons[restarted_router].save_snapshot()
+                    simulator.kill_router(restarted_router)
+                    simulator.restart_router(restarted_router, snapshot_file)
+                    expected = topology.expected_metrics()
+                elif scenario == "link_flap":
+                    router_a, router_b = sorted(topology.links)[len(topology.links) // 2]
+                    packets_before = sum(simulator.network.sent_packets.values())
+                    for _ in range(FLAPS):
+                        simulator.set_link_state(router_a, router_b, False)
+                        simulator.run(FLAP_DOWN_TIME)
+                        simulator.set_link_state(router_a, router_b, True)
+                        simulator.run(FLAP_UP_TIME)
+                    flap_packets = sum(simulator.network.sent_packets.values()) - packets_before
+                    expected = topology.expected_metrics()
+                elif scenario == "link_failure":
+                    router_a, router_b = failed_link = sorted(topology.links)[len(topology.links) // 2]
+                    simulator.set_link_state(router_a, router_b, False)
+                    expected = topology.expected_metrics(excluded_links={failed_link})
+                else:
+                    failed_router = topology.routers[len(topology.routers) // 2]
+                    simulator.kill_router(failed_router)
+                    expected = topology.expected_metrics(excluded_routers={failed_router})
+                result = measure_convergence(simulator, expected, timeout, tick)
+                if scenario == "link_flap":
+                    result["flap_packets"] = flap_packets
+        finally:
+            simulator.close()
+
+    result.update({
+        "topology": topology.name,
+        "routers": len(topology.routers),
+        "links": len(topology.links),
+        "scenario": scenario,
+    })
+    return result
+
+
+def main(arguments):
+    """
+        Runs every combination of the chosen topologies, sizes and scenarios and writes the results out as JSON
+    """
+    results = []
+    for topology_name in arguments.topologies:
+        for size in arguments.sizes:
+            topology = TOPOLOGIES[topology_name](size)
+            for scenario in arguments.scenarios:
+                for repeat in range(arguments.repeat):
+                    random.seed(arguments.seed + repeat) # The daemons' timer jitter and hold downs
+                    result = run_scenario(topology, scenario, arguments.timeout, arguments.tick, arguments.real_time, arguments.max_paths,
+                                          {} if arguments.flap_damping else None, arguments.hello_interval)
+                    result["seed"] = arguments.seed + repeat
+                    results.append(result)
+                    convergence_time = f"{result['convergence_time']:.2f}s" if result["converged"] else "did not converge"
+                    print(f"{topology.name:<12} {scenario:<14} {convergence_time:<18} {result['packets_sent']:>8} packets {result['bytes_sent']:>10} bytes", file=sys.stderr)
+
+    if arguments.repeat > 1:
+        print("Mean over all seeds:", file=sys.stderr)
+        for topology_name in arguments.topologies:
+            for size in arguments.sizes:
+                name = f"{topology_name}-{size}"
+                for scenario in arguments.scenarios:
+                    runs = [result for result in results if result["topology"] == name and result["scenario"] == scenario]
+                    times = [result["convergence_time"] for result in runs if result["converged"]]
+                    mean_time = f"{sum(times) / len(times):.2f}s" if times else "did not converge"
+                    mean_packets = sum(result["packets_sent"] for result in runs) / len(runs)
+                    print(f"{name:<12} {scenario:<14} {mean_time:<18} {mean_packets:>8.0f} packets  {len(times)}/{len(runs)} converged", file=sys.stderr)
+
+    output = json.dumps({"results": results}, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures how fast the RIP daemons converge on generated topologies")
+    parser.add_argument("--topologies", nargs="+", choices=sorted(TOPOLOGIES), default=sorted(TOPOLOGIES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[5, 10])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for each convergence before giving up")
+    parser.add_argument("--tick", type=float, default=0.01, help="seconds to sleep between simulation steps when running in real time")
+    parser.add_argument("--real-time", action="store_true", help="run in real time instead of jumping between timer deadlines on a virtual clock")
+    parser.add_argument("--max-paths", type=int, default=1, help="most equal-cost next hops each daemon keeps for a route")
+    parser.add_argument("--flap-damping", action="store_true", help="damp routes that flap with the daemons' default damping settings")
+    parser.add_argument("--hello-interval", type=float, help="run the daemons in fast hello mode with this many seconds between hellos")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the daemons' random timers, so runs are repeatable")
+    parser.add_argument("--repeat", type=int, default=1, help="run every scenario this many times with consecutive seeds")
+    parser.add_argument("--output", help="file to write the JSON results to, printed to stdout if not given")
+    main(parser.parse_args())
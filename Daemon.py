@@ -1,72 +1,336 @@
+import argparse
 import os
 import random
 import select
+import signal
 import socket
 import sys
-from time import sleep
+import time
 
+from Clock import *
 from RoutingTable import *
 from RIPPacket import *
+from RIPCodec import *
 from ConfigParser import *
+from AdvertisementCache import *
+from AsyncEngine import *
+from TriggeredUpdates import *
+from Dashboard import *
+from Stats import *
+from Profiler import *
+from PacketCapture import *
+from RouteSnapshot import *
+from FlapDamping import *
+from NeighbourTable import *
 
 LOCAL_HOST = '127.0.0.1'
+MAX_DATAGRAM_SIZE = 4096 # Size of each receive buffer
+RECEIVE_BATCH_SIZE = 64 # Number of datagrams read into preallocated buffers before the batch is processed
 
 
 class Daemon:
     """
     The daemon program that runs the RIP protocol on the routers
     """
-    def __init__(self, config_filename):
+    def __init__(self, config_filename, transport=None, clock=None, receive_buffer_size=None, max_paths=1, seed=None):
         """
         Initialises the router's information: Gets router id, input ports, output ports using the ConfigParser class
         :param config_filename: string, config filename (or file path) of the relevant router for getting routing information
+        :param transport: optional transport to send and receive packets with instead of UDP sockets (see Simulator.py)
+        :param clock: optional clock to read all timers from instead of the system's monotonic clock (see Clock.py)
+        :param receive_buffer_size: optional size in bytes of the kernel receive buffer (SO_RCVBUF) of each input socket
+        :param max_paths: most equal-cost next hops to keep for each route, 1 to keep only the best one
+        :param seed: optional seed for the daemon's own random timers, combined with its router id so they don't depend
+            on the other daemons in the same process. The shared random module is used if not given
         """
 
         config = ConfigParser().read_config_file(config_filename)
+        self.config_filename = config_filename
         self.router_id = config[0]
         self.input_ports = config[1]
         self.output_links = config[2]
+        self.transport = transport
+        self.clock = clock if clock is not None else SYSTEM_CLOCK
+        self.receive_buffer_size = receive_buffer_size
+        self.random = random.Random(f"{seed}-{self.router_id}") if seed is not None else random
         self.input_sockets = self.create_input_sockets()
+        self.input_socket_ports = dict(zip(self.input_sockets, self.input_ports))
+        self.receive_buffers = [memoryview(bytearray(MAX_DATAGRAM_SIZE)) for _ in range(RECEIVE_BATCH_SIZE)]
         self.blocking_time = 1 # only block for 1 second each loop
-        self.routing_table = RoutingTable()
-        self.periodic_update_timer = datetime.datetime.now() # Timer for periodic updates
-        self.periodic_update_timer_limit = 20 + random.randrange(-5, 5) # How long the periodic timer update should wait for
+        self.routing_table = RoutingTable(self.clock, max_paths)
+        self.advertisement_cache = AdvertisementCache(self.router_id, self.output_links, self.routing_table)
+        self.triggered_updates = TriggeredUpdates(self.routing_table, clock=self.clock, random_source=self.random)
+        self.neighbours = NeighbourTable(self.output_links, clock=self.clock) # When each neighbour was last heard from
+        self.hello_interval = None # Seconds between hellos to every neighbour in fast hello mode, None when it is off
+        self.hello_timer = self.clock.now() # Time the last hello was sent
+        self.periodic_update_timer = self.clock.now() # Timer for periodic updates
+        self.periodic_update_timer_limit = 20 + self.random.randrange(-5, 5) # How long the periodic timer update should wait for
         self.verbose_mode = False
+        self.display = ClearScreenDisplay(self) # What to show on the terminal, see Dashboard.py
+        self.stats = DaemonStats(self)
+        self.stats_server = None # Optional StatsServer serving the stats over a UNIX domain socket
+        self.profiler = None # Optional Profiler timing each phase of the run loop, see Profiler.py
+        self.capture = None # Optional PacketCapture logging every received datagram
+        self.snapshot_file = None # Optional file the routing table is saved to, and restored from on startup
+        self.snapshot_interval = 30 # Seconds between snapshots of the routing table
+        self.snapshot_timer = self.clock.now() # Time of the last snapshot
+        self.snapshot_version = None # Routing table version saved in the last snapshot
+        self.provisional_lifetime = 10 # Seconds a route restored from a snapshot lasts unless a neighbour confirms it
+        self.restored_routes = 0 # Number of routes restored from the snapshot on startup
+        self.reload_requested = False # Set by the SIGHUP handler, the config is re-read by the run loop
+        self.select_wait = 0 # Seconds the last call to receive_packets spent blocked waiting for packets
 
     def create_input_sockets(self):
         """
-        Creates, binds and stores a socket for every input port
+        Creates, binds and stores a socket for every input port. If the daemon has a transport, binds the input ports
+        on the transport instead
         :return: list of sockets
         """
         sockets = []
+        if self.transport is not None:
+            self.transport.bind(self, self.input_ports)
+            return sockets
         for port in self.input_ports:
-            temp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            temp_socket.bind((LOCAL_HOST, port))
-            sockets.append(temp_socket)
+            sockets.append(self.create_input_socket(port))
         return sockets
 
+    def create_input_socket(self, port):
+        """
+        Creates and binds a socket for the given input port
+        :return: the socket
+        """
+        temp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.receive_buffer_size:
+            temp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+        temp_socket.bind((LOCAL_HOST, port))
+        temp_socket.setblocking(False) # So receive_packets can drain each socket until it is empty
+        return temp_socket
+
     def send_rip_packets(self):
-        """Sends a full RIP packet with entries for all routes in routing table
-            (to all directly connected neighbours)"""
-        message = RIPPacket(self.router_id)
-        send_socket = self.input_sockets[0]
-        for port in self.output_links.get_ports_list():
-            if self.verbose_mode: print('port', port)
-            for route in self.routing_table.routes:
-                """Below if-block is for split horizon with poisoned reverse:
-                    Checks if next hop is different to destination and if the router id of the message is being sent is 
-                    the same as the next hop. If true sets metric to infinity so receiving router does not process the 
-                    route, otherwise sends it normally"""
-                if route.next_hop != route.destination and \
-                        self.output_links.get_link_by_port(port).router_id == route.next_hop:
-                    message.append_entry(route.destination, 16)
-                else:
-                    message.append_entry(route.destination, route.metric)
+        """Sends full RIP packets with entries for all routes in routing table
+            (to all directly connected neighbours). Tables with more than 25 routes are split over several packets.
+            The packets come from the advertisement cache, which already applies split horizon with poisoned reverse"""
+        for link in self.output_links.links:
+            if self.verbose_mode: print('port', link.port)
+            for packet in self.advertisement_cache.get_packets(link.port):
+                self.send_packet(packet, link.port)
+
+    def send_request(self, links=None):
+        """
+            Asks directly connected neighbours to send their whole routing tables straight away
+            :param links: the links of the neighbours to ask, all of them if not given
+        """
+        request = encode_request(self.router_id)
+        for link in self.output_links.links if links is None else links:
+            self.send_packet(request, link.port)
+        self.stats.requests_sent += 1
+
+    def send_table(self, link):
+        """
+            Sends the full routing table to the neighbour on the given link
+        """
+        for packet in self.advertisement_cache.get_packets(link.port):
+            self.send_packet(packet, link.port)
+
+    def send_startup_packets(self):
+        """
+            Sends the full routing table to all neighbours when the daemon starts. If routes were restored from a
+            snapshot, also asks the neighbours for their tables so the provisional routes are confirmed in seconds
+        """
+        self.send_rip_packets()
+        if self.restored_routes:
+            self.send_request()
+
+    def answer_request(self, link):
+        """
+            Sends the full routing table to the neighbour on the given link, in answer to its request
+        """
+        self.stats.requests_received += 1
+        self.send_table(link)
+
+    def request_reload(self):
+        """
+            Asks the run loop to re-read the config file. Called from the SIGHUP handler
+        """
+        self.reload_requested = True
+
+    def check_reload(self):
+        """
+            Re-reads the config file if a reload has been asked for. If the new config is invalid the daemon keeps
+            running with the old one
+        """
+        if not self.reload_requested:
+            return
+        self.reload_requested = False
+        try:
+            self.reload_config()
+        except Exception as exception:
+            print(exception)
+
+    def reload_config(self):
+        """
+            Re-reads the config file and applies the differences without restarting: only the input ports that were added
+            or removed are bound or closed, routes over links whose metric changed are adjusted in place, and the changed
+            routes go out in a single triggered update
+        """
+        router_id, input_ports, output_links = ConfigParser().read_config_file(self.config_filename)
+        if router_id != self.router_id:
+            raise Exception(f"Error: Router id can't be changed from {self.router_id} to {router_id} without restarting")
+        self.update_input_ports(input_ports)
+        self.update_output_links(output_links)
+        self.stats.config_reloads += 1
+        if self.triggered_updates.dirty:
+            self.send_triggered_update()
+
+    def update_input_ports(self, input_ports):
+        """
+            Binds the input ports that are new and closes the ones that are gone, leaving the rest untouched.
+            The new ports are all bound before anything is closed, so a port that can't be bound changes nothing
+        """
+        new_ports = set(input_ports)
+        old_ports = set(self.input_ports)
+        added = [port for port in input_ports if port not in old_ports]
+        removed = [port for port in self.input_ports if port not in new_ports]
+
+        if self.transport is not None:
+            self.transport.unbind(removed)
+            self.transport.bind(self, added)
+        else:
+            added_sockets = []
             try:
-                send_socket.sendto(message.packet, (LOCAL_HOST, port))
-                message.refresh_entries()  # Deletes all entries from message
-            except:
-                pass
+                for port in added:
+                    added_sockets.append(self.create_input_socket(port))
+            except OSError as exception:
+                for added_socket in added_sockets:
+                    added_socket.close()
+                raise Exception(f"Error: Could not bind input port {port}: {exception}")
+            for input_socket, port in list(self.input_socket_ports.items()):
+                if port not in new_ports:
+                    input_socket.close()
+                    self.input_sockets.remove(input_socket)
+                    del self.input_socket_ports[input_socket]
+            for input_socket, port in zip(added_sockets, added):
+                self.input_sockets.append(input_socket)
+                self.input_socket_ports[input_socket] = port
+        self.input_ports = list(input_ports)
+        if self.verbose_mode: print(f"Input ports added: {added}, removed: {removed}")
+
+    def update_output_links(self, output_links):
+        """
+            Switches to the new output links. Routes through neighbours that are gone are marked for deletion, routes
+            through links whose metric changed have their metric moved by the same amount, and new neighbours are sent
+            the whole table and asked for theirs. Routes with other equal-cost next hops just stop using the neighbour,
+            which is no longer equal. If any route got worse, every neighbour is asked for its table so better routes
+            through other neighbours are found straight away
+        """
+        old_links = {link.router_id: link for link in self.output_links.links}
+        new_links = {link.router_id: link for link in output_links.links}
+        routes_worse = False
+        for neighbour_id, link in old_links.items():
+            new_link = new_links.get(neighbour_id)
+            if new_link is not None and new_link.metric == link.metric:
+                continue
+            routes_worse = routes_worse or new_link is None or new_link.metric > link.metric
+            for route in self.routing_table.get_routes_by_next_hop(neighbour_id):
+                if route.garbage_timer is not None:
+                    continue
+                if len(route.next_hops) > 1:
+                    route.drop_next_hop(neighbour_id)
+                    routes_worse = True # Asks the neighbour again in case its link got better
+                    continue
+                metric = route.metric + new_link.metric - link.metric if new_link is not None else 16
+                if metric >= 16:
+                    route.mark_for_deletion()
+                else:
+                    route.set_metric(metric)
+
+        self.output_links = output_links
+        self.neighbours.reset_links(output_links)
+        self.advertisement_cache.reset_links(output_links)
+        added_links = [link for neighbour_id, link in new_links.items() if neighbour_id not in old_links]
+        for link in added_links:
+            self.send_table(link)
+        if routes_worse:
+            self.send_request()
+        elif added_links:
+            self.send_request(added_links)
+
+    def save_snapshot(self):
+        """
+            Writes the routing table to the snapshot file if it has changed since the last snapshot
+        """
+        if self.snapshot_file is None or self.routing_table.version == self.snapshot_version:
+            return
+        write_snapshot(self.snapshot_file, self.router_id, self.routing_table)
+        self.snapshot_version = self.routing_table.version
+
+    def restore_snapshot(self):
+        """
+            Adds the routes in the snapshot file to the routing table as provisional routes. Routes through routers
+            that are no longer neighbours are left out
+            :return: the number of routes restored
+        """
+        if self.snapshot_file is None or not os.path.isfile(self.snapshot_file):
+            return 0
+        router_id, entries = read_snapshot(self.snapshot_file)
+        if router_id != self.router_id:
+            raise Exception(f"Error: Routing table snapshot {self.snapshot_file} belongs to router {router_id}")
+        for destination, next_hop, metric in entries:
+            if destination == self.router_id or metric >= 16 or self.routing_table.check_route_known(destination):
+                continue
+            if self.output_links.check_router_in_outputs(next_hop):
+                self.routing_table.add_provisional_route(destination, next_hop, metric, self.provisional_lifetime)
+                self.restored_routes += 1
+        self.snapshot_version = self.routing_table.version
+        return self.restored_routes
+
+    def check_snapshot_timer(self):
+        """
+            Saves a snapshot of the routing table if the snapshot interval has passed
+        """
+        if self.snapshot_file is not None and self.clock.now() >= self.snapshot_timer + self.snapshot_interval:
+            self.snapshot_timer = self.clock.now()
+            self.save_snapshot()
+
+    def send_periodic_update(self):
+        """
+            Sends the full routing table to all directly connected neighbours as a periodic update
+        """
+        self.send_rip_packets()
+        self.stats.periodic_updates += 1
+        self.triggered_updates.periodic_update_sent()
+
+    def send_triggered_update(self):
+        """
+            Sends a RIP packet holding only the routes that have changed since the last update to all directly connected neighbours
+        """
+        destinations = self.triggered_updates.take_dirty()
+        self.stats.triggered_updates += 1
+        for link in self.output_links.links:
+            for packet in self.advertisement_cache.get_delta_packets(link.port, destinations):
+                self.send_packet(packet, link.port)
+
+    def send_hello(self):
+        """
+            Sends a hello to every neighbour, only so they know this router is still alive and how often to expect hellos
+        """
+        hello = encode_hello(self.router_id, self.hello_interval)
+        for link in self.output_links.links:
+            self.send_packet(hello, link.port)
+        self.stats.hellos_sent += 1
+
+    def send_packet(self, packet, port):
+        """
+            Sends a single encoded RIP packet to the given output port
+        """
+        self.stats.packet_sent(port, len(packet))
+        if self.transport is not None:
+            self.transport.sendto(packet, port)
+            return
+        try:
+            self.input_sockets[0].sendto(packet, (LOCAL_HOST, port))
+        except:
+            pass
 
     def close_sockets(self):
         """
@@ -75,16 +339,66 @@ class Daemon:
         for socket in self.input_sockets:
             socket.close()
         self.input_sockets.clear()
+        self.input_socket_ports.clear()
+        if self.stats_server is not None:
+            self.stats_server.close()
+            self.stats_server = None
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+        if self.transport is not None:
+            self.transport.close()
 
     def receive_packets(self):
         """
-            Checks all incoming ports for packets ready to be read. If there are packets, it reads them and interprets the data.
+            Checks all incoming ports for packets ready to be read. If there are packets, it drains every pending packet from
+            each ready socket into the preallocated receive buffers, then interprets the whole batch
         """
-        readable_sockets, _, _ = select.select(self.input_sockets, [], [], self.blocking_time)
+        readers = self.input_sockets if self.stats_server is None else self.input_sockets + [self.stats_server]
+        writers = self.stats_server.get_waiting_clients() if self.stats_server is not None else []
+        wait_start = time.perf_counter()
+        readable_sockets, writable_sockets, _ = select.select(readers, writers, [], self.blocking_time)
+        self.select_wait = time.perf_counter() - wait_start
+        if writers:
+            self.stats_server.send_waiting(writable_sockets)
 
+        batch = []
         for socket in readable_sockets:
-            data, _ = socket.recvfrom(4096)
-            self.process_packet(data)
+            if socket is self.stats_server:
+                self.stats_server.handle()
+                continue
+            port = self.input_socket_ports[socket]
+            while True:
+                if len(batch) == RECEIVE_BATCH_SIZE: # All the buffers are in use, so process them before reading more
+                    self.process_packets(batch)
+                    batch = []
+                buffer = self.receive_buffers[len(batch)]
+                try:
+                    size, _ = socket.recvfrom_into(buffer)
+                except (BlockingIOError, InterruptedError):
+                    break # No more packets waiting on this socket
+                except OSError:
+                    break
+                batch.append((buffer[:size], port))
+        self.process_packets(batch)
+
+    def process_packets(self, batch):
+        """
+            Interprets every packet in a batch of received packets. Any triggered update is only requested once the table
+            has been updated, so it is considered after the whole batch has been applied
+            :param batch: list of (bytes-like object containing a RIP packet, input port it arrived on) tuples
+        """
+        for data, port in batch:
+            self.handle_packet(data, port)
+
+    def handle_packet(self, data, port):
+        """
+            Counts a packet received on the given input port then interprets it
+        """
+        self.stats.packet_received(port, len(data))
+        if self.capture is not None:
+            self.capture.write(self.clock.now(), port, data)
+        self.process_packet(data)
 
     def process_packet(self, data):
         """
@@ -94,28 +408,42 @@ class Daemon:
         """
 
         routing_table_updated = False
+        routes_withdrawn = False
 
-        rip_header = data[:4]
-        rip_data = data[4:]
-        command = rip_header[0]
-        version = rip_header[1]
-        next_hop_router_id = int.from_bytes(rip_header[2:], "big")
+        if len(data) < HEADER.size:
+            if self.verbose_mode: print("Error: Incoming packet is too short")
+            self.stats.packet_discarded("too_short")
+            return
+        command, version, next_hop_router_id = decode_header(data)
 
-        if command != 2:
+        if command != COMMAND and command != REQUEST:
             if self.verbose_mode: print("Error: Incoming packet command is invalid")
+            self.stats.packet_discarded("invalid_command")
             return
         if version != 2:
             if self.verbose_mode: print("Error: Incoming packet version is invalid")
+            self.stats.packet_discarded("invalid_version")
             return
         if not (0 < next_hop_router_id < 64001):
             if self.verbose_mode: print("Error: Incoming packet router id is invalid")
+            self.stats.packet_discarded("invalid_router_id")
             return
-        if not self.output_links.check_router_in_outputs(next_hop_router_id):
+        link = self.neighbours.get_link(next_hop_router_id)
+        if link is None:
             if self.verbose_mode: print("Discarding packet: Router id not in outputs")
+            self.stats.packet_discarded("not_a_neighbour")
             return
 
         if self.verbose_mode: print(f"Received packet from router {next_hop_router_id}")
-        link = self.output_links.get_link_by_router(next_hop_router_id)
+        hello_interval = decode_hello_interval(data) if command == COMMAND else None
+        if self.neighbours.heard_from(next_hop_router_id, hello_interval=hello_interval):
+            # The neighbour was declared dead, so ask for its whole table to relearn the routes through it straight away
+            if self.verbose_mode: print("Neighbour is back, requesting its routing table")
+            self.send_request([link])
+        if command == REQUEST:
+            if self.verbose_mode: print("Answering request for the whole routing table")
+            self.answer_request(link)
+            return
         if not self.routing_table.check_route_known(next_hop_router_id):
             self.routing_table.add_route(next_hop_router_id, next_hop_router_id, link.metric)
             if self.verbose_mode: print("route not known")
@@ -126,34 +454,33 @@ class Daemon:
             if link.metric < route.metric:
                 route.update_route(next_hop_router_id, next_hop_router_id, link.metric)
                 routing_table_updated = True
+            # The direct link is as good as the current route, so it becomes one of its equal-cost next hops
+            elif link.metric == route.metric and route.garbage_timer is None and route.add_next_hop(next_hop_router_id):
+                routing_table_updated = True
             # Reset the timers for the route
             if route.next_hop == next_hop_router_id:
                 route.reset_timers()
             
 
-        routes = []
-        for i in range(0, int(len(rip_data)), 20):
-            routes.append(rip_data[i:i + 20])
-
-        for route in routes:
+        for packet_afi, _, router_id, metric in (iter_entries(data) if hello_interval is None else ()):
 
             # Check the packet AFI
-            packet_afi = int.from_bytes(route[:2], 'big')
             if packet_afi != 0:
                 if self.verbose_mode: print("Discarding route: AFI is invalid")
+                self.stats.entry_discarded("invalid_afi")
+                continue
 
             # Check if the incoming router id is valid
-            router_id = int.from_bytes(route[4:8], 'big')
             if self.verbose_mode: print(f"Route router id: {router_id}")
             if not (0 < router_id < 64001):
                 if self.verbose_mode: print("Discarding route: Incoming route router id is invalid")
+                self.stats.entry_discarded("invalid_router_id")
                 continue
             if router_id == self.router_id:
                 if self.verbose_mode: print("Discarding route: Router id is the same as host router")
+                self.stats.entry_discarded("own_router_id")
                 continue
 
-            link = self.output_links.get_link_by_router(next_hop_router_id)
-            metric = int.from_bytes(route[16:], 'big')
             route_object = self.routing_table.get_route_by_router(router_id)
             if self.verbose_mode: print('metric', metric)
 
@@ -162,6 +489,7 @@ class Daemon:
             # cost included because otherwise it wouldn't mark invalid routes for deletion 
             if (not (0 < (metric + link.metric) < 17)) and metric != 16:
                 if self.verbose_mode: print("Discarding route: Incoming route metric is invalid")
+                self.stats.entry_discarded("invalid_metric")
                 continue
             
             
@@ -172,10 +500,18 @@ class Daemon:
                     # If route metric is infinite and route hasn't been marked for deletion already
                     if metric == 16:
                         if route_object.garbage_timer == None:
-                            route_object.mark_for_deletion()
-                            if self.verbose_mode: print("route marked for deletion")
+                            if route_object.drop_next_hop(next_hop_router_id):
+                                if self.verbose_mode: print("route failed over to an equal-cost next hop")
+                            else:
+                                route_object.mark_for_deletion()
+                                if self.verbose_mode: print("route marked for deletion")
+                                routes_withdrawn = True
                             routing_table_updated = True
                         continue
+                    # The path through this next hop got worse, so use an equal-cost next hop instead if there is one
+                    elif metric + link.metric > route_object.metric and route_object.drop_next_hop(next_hop_router_id):
+                        if self.verbose_mode: print("route failed over to an equal-cost next hop")
+                        routing_table_updated = True
                     # Updates route (whether its better or worse) if metric is different
                     elif route_object.metric != metric + link.metric:
                         route_object.update_route(route_object.destination, next_hop_router_id, metric + link.metric)
@@ -189,6 +525,16 @@ class Daemon:
                         route_object.update_route(route_object.destination, next_hop_router_id, metric + link.metric)
                         if self.verbose_mode: print("route updated: route has better metric")
                         routing_table_updated = True
+                    elif metric + link.metric == route_object.metric and route_object.garbage_timer is None:
+                        # Equal-cost path, kept alongside the current next hop or refreshed if it already is one
+                        if route_object.add_next_hop(next_hop_router_id):
+                            if self.verbose_mode: print("route added an equal-cost next hop")
+                            routing_table_updated = True
+                    elif route_object.is_multipath and next_hop_router_id in route_object.next_hops:
+                        # An equal-cost next hop that got worse or was withdrawn
+                        route_object.drop_next_hop(next_hop_router_id)
+                        if self.verbose_mode: print("route dropped an equal-cost next hop")
+                        routing_table_updated = True
             elif metric < 16:
                 self.routing_table.add_route(router_id, next_hop_router_id, metric + link.metric)
                 if self.verbose_mode: print("route added")
@@ -196,37 +542,105 @@ class Daemon:
             if self.verbose_mode: print()
         
         if routing_table_updated:
-            if self.verbose_mode: print("Sending update message")
-            self.send_rip_packets()
+            if self.verbose_mode: print("Requesting triggered update")
+            self.triggered_updates.request(immediate=routes_withdrawn)
     
     def get_periodic_update_timer(self):
         """
             Converts the update timer into seconds
         """
-        return (datetime.datetime.now() - self.periodic_update_timer).seconds
+        return int(self.clock.now() - self.periodic_update_timer)
+
+    def get_periodic_update_deadline(self):
+        """
+            Returns the clock time at which the next periodic update is due
+        """
+        return self.periodic_update_timer + self.periodic_update_timer_limit
     
     def reset_periodic_update_timer(self):
         """
             Resets the update timer to the current time
         """
-        self.periodic_update_timer = datetime.datetime.now()
+        self.periodic_update_timer = self.clock.now()
+
+    def get_hello_deadline(self):
+        """
+            Returns the clock time at which the next hello is due, or None if fast hello mode is off
+        """
+        if self.hello_interval is None:
+            return None
+        return self.hello_timer + self.hello_interval
+
+    def get_route_timer_deadline(self):
+        """
+            Returns the clock time of the earliest route timer or neighbour liveness deadline, or None if there are none
+        """
+        deadlines = [self.routing_table.next_timer_deadline(), self.neighbours.next_deadline()]
+        return min((deadline for deadline in deadlines if deadline is not None), default=None)
+
+    def get_next_deadline(self):
+        """
+            Returns the clock time of the earliest of the periodic update, hello, triggered update, route timer and
+            neighbour liveness deadlines
+        """
+        deadlines = [self.get_periodic_update_deadline(), self.get_hello_deadline(), self.triggered_updates.deadline, self.get_route_timer_deadline()]
+        return min(deadline for deadline in deadlines if deadline is not None)
 
     def check_periodic_update_timer(self):
         """
             Checks if the update timer has expired, if so, sends out updates then resets the timer
         """
-        if self.get_periodic_update_timer() > self.periodic_update_timer_limit:
+        if self.clock.now() >= self.get_periodic_update_deadline():
             if self.verbose_mode: print("Sending periodic updates")
-            self.send_rip_packets()
+            self.send_periodic_update()
             self.reset_periodic_update_timer()
+
+    def check_hello_timer(self):
+        """
+            Checks if a hello is due in fast hello mode, if so, sends one to every neighbour then resets the timer
+        """
+        deadline = self.get_hello_deadline()
+        if deadline is not None and self.clock.now() >= deadline:
+            self.send_hello()
+            self.hello_timer = self.clock.now()
+
+    def check_triggered_update_timer(self):
+        """
+            Checks if the hold down of a pending triggered update has expired, if so, sends out the changed routes
+        """
+        if self.triggered_updates.is_due():
+            if self.verbose_mode: print("Sending triggered update")
+            self.send_triggered_update()
     
     def check_route_timers(self):
         """
-            Tells the routing table to check the timers for all its routes
-            If a route has been changed, triggers an update
+            Declares dead the neighbours that haven't been heard from in time, invalidating only the routes through them,
+            then tells the routing table to check the timers for all its routes
+            If a route has been marked for deletion or removed, poisons it to the neighbours straight away.
+            Suppressed routes that are due to be reused are advertised again in a triggered update
         """
-        if self.routing_table.check_route_timers():
-            self.send_rip_packets()
+        routes_withdrawn = False
+        for router_id in self.neighbours.pop_dead():
+            if self.verbose_mode: print(f"Neighbour {router_id} timed out")
+            if self.routing_table.invalidate_next_hop(router_id):
+                routes_withdrawn = True
+        if self.routing_table.check_route_timers() or routes_withdrawn:
+            self.triggered_updates.request(immediate=True)
+        if self.routing_table.check_reuse_timers():
+            self.triggered_updates.request()
+
+    def enable_fast_hello(self, interval):
+        """
+            Sends a hello to every neighbour every given number of seconds. Each hello carries the interval, so the
+            neighbours declare this router dead after a few intervals without hearing from it, in seconds instead of 30
+        """
+        self.hello_interval = interval
+
+    def enable_flap_damping(self, **settings):
+        """
+            Starts damping routes that flap, see FlapDamping for the settings
+        """
+        self.routing_table.flap_damping = FlapDamping(self.routing_table, clock=self.clock, **settings)
 
     def print_routing_table(self):
         """
@@ -243,34 +657,104 @@ class Daemon:
         """
             Loops infinitely doing the required tasks to run the rip protocol
         """
-        self.send_rip_packets()
+        self.send_startup_packets()
         while(1):
-            self.print_routing_table()
+            start = time.perf_counter()
+            self.display.update()
             self.receive_packets()
             self.check_periodic_update_timer()
+            self.check_hello_timer()
             self.check_route_timers()
-            sleep(2)
+            self.check_triggered_update_timer()
+            self.check_snapshot_timer()
+            self.check_reload()
+            self.stats.loop_finished(time.perf_counter() - start - self.select_wait)
+            if self.profiler is not None:
+                self.profiler.tick()
 
-def main(config_filename):
+def main(arguments):
     """
         Runs the RIP Daemon
-        :param config_filename: string, config filename (or file path) of the relevant router for getting routing information
+        :param arguments: parsed command line arguments, see parse_arguments
     """
     try:
-        daemon = Daemon(config_filename)
-        daemon.run_rip_daemon()
+        daemon = Daemon(arguments.config_filename, receive_buffer_size=arguments.receive_buffer, max_paths=arguments.max_paths)
+        daemon.display = create_display(arguments.display, daemon, arguments.refresh_rate)
+        if arguments.hello_interval:
+            daemon.enable_fast_hello(arguments.hello_interval)
+        if arguments.flap_damping:
+            daemon.enable_flap_damping(half_life=arguments.damping_half_life, suppress_limit=arguments.damping_suppress,
+                                       reuse_limit=arguments.damping_reuse, max_suppress_time=arguments.damping_max_suppress)
+        if arguments.stats_socket:
+            daemon.stats_server = StatsServer(daemon.stats, arguments.stats_socket)
+        if arguments.stats_file:
+            signal.signal(signal.SIGUSR1, lambda signal_number, frame: daemon.stats.dump(arguments.stats_file))
+        signal.signal(signal.SIGHUP, lambda signal_number, frame: daemon.request_reload())
+        if arguments.profile or arguments.cprofile or arguments.capture or arguments.snapshot:
+            # Exit through the finally block on SIGTERM too, so the profile, capture and snapshot are written out however the daemon is stopped
+            signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+        if arguments.capture:
+            daemon.capture = PacketCapture(arguments.capture)
+        if arguments.snapshot:
+            daemon.snapshot_file = arguments.snapshot
+            daemon.snapshot_interval = arguments.snapshot_interval
+            try:
+                restored_routes = daemon.restore_snapshot()
+                if restored_routes: print(f"Restored {restored_routes} routes from {arguments.snapshot}")
+            except Exception as exception: # A bad snapshot shouldn't stop the daemon from starting
+                print(exception)
+        if arguments.profile or arguments.cprofile:
+            Profiler(arguments.cprofile, arguments.cprofile_start, arguments.cprofile_duration).attach(daemon)
+        if arguments.asyncio:
+            AsyncEngine(daemon).run()
+        else:
+            daemon.run_rip_daemon()
     except Exception as exception:
             print(exception)
     finally:
         # Check if daemon was initialised and close sockets if it was
         if 'daemon' in locals(): 
+            if daemon.profiler is not None:
+                daemon.profiler.stop_cprofile()
+                if arguments.profile:
+                    daemon.profiler.dump(arguments.profile)
+            daemon.save_snapshot()
             daemon.close_sockets()
         quit()
 
 
+def parse_arguments(argv):
+    """
+        Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser(description="RIPv2 routing daemon")
+    parser.add_argument("config_filename", help="config filename (or file path) of the router")
+    parser.add_argument("--asyncio", action="store_true", help="process packets as they arrive and fire timers at their exact deadlines")
+    parser.add_argument("--receive-buffer", type=int, help="size in bytes of the kernel receive buffer of each input socket")
+    parser.add_argument("--max-paths", type=int, default=1, help="most equal-cost next hops to keep for each route, failing over between them instantly")
+    parser.add_argument("--hello-interval", type=float, help="fast hello mode: seconds between hellos to every neighbour, "
+                        "which then declares this router dead after three intervals without hearing from it")
+    parser.add_argument("--flap-damping", action="store_true", help="stop advertising routes that keep becoming unreachable until they are stable again")
+    parser.add_argument("--damping-half-life", type=float, default=120, help="seconds for a route's flap penalty to decay to half")
+    parser.add_argument("--damping-suppress", type=float, default=2000, help="penalty at which a route is suppressed, each flap adds 1000")
+    parser.add_argument("--damping-reuse", type=float, default=750, help="penalty below which a suppressed route is advertised again")
+    parser.add_argument("--damping-max-suppress", type=float, default=600, help="most seconds a route stays suppressed after its last flap")
+    parser.add_argument("--display", choices=DISPLAYS, default="clear", help="clear the terminal and print the table every second, "
+                        "redraw an ANSI dashboard only when the table changes, or print nothing")
+    parser.add_argument("--headless", dest="display", action="store_const", const="headless", help="same as --display headless")
+    parser.add_argument("--refresh-rate", type=float, default=2, help="most dashboard redraws per second")
+    parser.add_argument("--stats-socket", help="path of a UNIX domain socket to serve the daemon's stats on as JSON")
+    parser.add_argument("--stats-file", help="file to dump the daemon's stats to as JSON when the daemon receives SIGUSR1")
+    parser.add_argument("--capture", help="write every received datagram with its arrival time and input port to this file, for Replay.py")
+    parser.add_argument("--snapshot", help="file to save the routing table to periodically and on exit, and to restore it from on startup")
+    parser.add_argument("--snapshot-interval", type=float, default=30, help="seconds between snapshots of the routing table")
+    parser.add_argument("--profile", help="time every run loop phase and packet, and write the latency histograms to this file as JSON on exit")
+    parser.add_argument("--cprofile", help="run cProfile over a window of the run and write its stats to this file")
+    parser.add_argument("--cprofile-start", type=float, default=0, help="seconds after starting to open the cProfile window")
+    parser.add_argument("--cprofile-duration", type=float, default=60, help="seconds the cProfile window stays open")
+    return parser.parse_args(argv)
+
+
 if __name__=="__main__":
-    if len(sys.argv) != 2:
-        print("Error: You must input exactly one parameter which is the config file name")
-    else:
-        config_filename = sys.argv[1]
-        main(config_filename)
\ No newline at end of file
+    arguments = parse_arguments(sys.argv[1:])
+    main(arguments)
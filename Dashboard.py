@@ -0,0 +1,99 @@
+import sys
+
+CURSOR_HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_TO_END_OF_LINE = "\x1b[K"
+CLEAR_TO_END_OF_SCREEN = "\x1b[J"
+
+
+class ClearScreenDisplay:
+    """Display that clears the terminal and prints the routing table, at most once every refresh interval"""
+    def __init__(self, daemon, refresh_interval=1):
+        """
+            Initializes the display for the given daemon
+            :param refresh_interval: the fewest seconds between prints, and the seconds between updates when the daemon
+                is run by the asyncio engine
+        """
+        self.daemon = daemon
+        self.refresh_interval = refresh_interval
+        self.last_print = None # Clock time the table was last printed
+
+    def update(self):
+        """
+            Clears the terminal then prints the routing table, unless it was printed less than the refresh interval ago
+        """
+        now = self.daemon.clock.now()
+        if self.last_print is not None and now - self.last_print < self.refresh_interval:
+            return
+        self.last_print = now
+        self.daemon.print_routing_table()
+
+
+class HeadlessDisplay:
+    """Display that prints nothing, for running many daemons on one host"""
+    refresh_interval = None
+
+    def update(self):
+        """
+            Does nothing
+        """
+
+
+class Dashboard:
+    """
+        Display that redraws the routing table with ANSI escape sequences written straight to the terminal.
+        It only redraws when the routing table has changed, and no more often than the given refresh rate.
+        The timer columns show their values at the time of the last redraw
+    """
+    def __init__(self, daemon, max_refresh_rate=2, output=None):
+        """
+            Initializes the dashboard for the given daemon
+            :param max_refresh_rate: the most redraws per second
+            :param output: file to write to, standard output if not given
+        """
+        self.daemon = daemon
+        self.refresh_interval = 1 / max_refresh_rate
+        self.output = output if output is not None else sys.stdout
+        self.drawn_version = None # Version of the routing table that is on the screen
+        self.last_redraw = None # Clock time of the last redraw
+        self.cleared = False # Whether the terminal has been cleared before the first drawing
+
+    def update(self):
+        """
+            Redraws the routing table if it has changed since the last redraw and the refresh interval has passed
+        """
+        table = self.daemon.routing_table
+        if table.version == self.drawn_version:
+            return
+        now = self.daemon.clock.now()
+        if self.last_redraw is not None and now - self.last_redraw < self.refresh_interval:
+            return
+        self.drawn_version = table.version
+        self.last_redraw = now
+        self.redraw()
+
+    def redraw(self):
+        """
+            Moves the cursor to the top of the terminal and overwrites the previous drawing line by line
+        """
+        lines = [f"Router ID: {self.daemon.router_id}"] + str(self.daemon.routing_table).split("\n")
+        prefix = CURSOR_HOME
+        if not self.cleared: # Clear anything left on the terminal from before the first drawing
+            prefix = CLEAR_SCREEN + CURSOR_HOME
+            self.cleared = True
+        self.output.write(prefix + "".join(line + CLEAR_TO_END_OF_LINE + "\n" for line in lines) + CLEAR_TO_END_OF_SCREEN)
+        self.output.flush()
+
+
+DISPLAYS = ["clear", "dashboard", "headless"]
+
+
+def create_display(name, daemon, max_refresh_rate=2):
+    """
+        Creates the display with the given name for the daemon
+    """
+    if name == "dashboard":
+        return Dashboard(daemon, max_refresh_rate)
+    if name == "headless":
+        return HeadlessDisplay()
+    return ClearScreenDisplay(daemon)
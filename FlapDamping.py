@@ -0,0 +1,149 @@
+import heapq
+import math
+
+from Clock import *
+
+FLAP_PENALTY = 1000 # Penalty added every time a route becomes unreachable
+
+
+class FlapDamping:
+    """
+        Route flap damping in the style of RFC 2439. Every time a route becomes unreachable its destination gets a
+        penalty, which decays exponentially with the configured half life. Once the penalty reaches the suppress limit,
+        the route is suppressed: it is advertised as unreachable, and its changes set off no triggered updates, until
+        the penalty has decayed below the reuse limit. Penalties are only kept for destinations that have flapped, and
+        are forgotten once they decay below half the reuse limit
+    """
+    def __init__(self, routing_table, half_life=120, suppress_limit=2000, reuse_limit=750, max_suppress_time=600, clock=SYSTEM_CLOCK):
+        """
+            Initializes the damping state and registers it for changes to the routing table
+            :param routing_table: RoutingTable object whose routes should be damped
+            :param half_life: seconds for a penalty to decay to half its value
+            :param suppress_limit: penalty at which a route is suppressed
+            :param reuse_limit: penalty below which a suppressed route is advertised again
+            :param max_suppress_time: most seconds a route can stay suppressed after its last flap, which caps the penalty
+            :param clock: clock the penalties decay by
+        """
+        if not 0 < reuse_limit < suppress_limit:
+            raise Exception("Error: Flap damping reuse limit must be above 0 and below the suppress limit")
+        if half_life <= 0 or max_suppress_time <= 0:
+            raise Exception("Error: Flap damping half life and max suppress time must be positive")
+        self.routing_table = routing_table
+        self.clock = clock
+        self.half_life = half_life
+        self.suppress_limit = suppress_limit
+        self.reuse_limit = reuse_limit
+        self.max_penalty = reuse_limit * 2 ** (max_suppress_time / half_life)
+        self.forget_limit = reuse_limit / 2 # Penalty below which a destination that isn't suppressed is forgotten
+        self.penalties = {} # Penalty of each destination that has flapped, with the time it was last worked out
+        self.suppressed = {} # Time each suppressed destination is due to be reused
+        self.reuse_heap = [] # (reuse time, destination) of suppressed destinations, stale once the reuse time moves
+        self.forget_times = {} # Time the penalty of each destination that isn't suppressed decays below the forget limit
+        self.forget_heap = [] # (forget time, destination) of destinations that aren't suppressed, stale once the forget time moves
+        self.withdrawn = set() # Destinations that have been unreachable since they were last penalized
+        self.flaps = 0 # Number of times a penalty was added
+        self.suppressions = 0 # Number of times a route was suppressed
+        routing_table.add_change_listener(self.route_changed)
+
+    def get_penalty(self, destination, now=None):
+        """
+            Returns the penalty of the given destination decayed up to now
+        """
+        penalty, updated = self.penalties.get(destination, (0, 0))
+        if not penalty:
+            return 0
+        if now is None:
+            now = self.clock.now()
+        return penalty * 0.5 ** ((now - updated) / self.half_life)
+
+    def is_suppressed(self, destination):
+        """
+            Checks if the route for the given destination is suppressed
+        """
+        return destination in self.suppressed
+
+    def route_changed(self, destination):
+        """
+            Adds a penalty when the route for the given destination has just become unreachable
+        """
+        route = self.routing_table.get_route_by_router(destination)
+        if route is not None and route.metric < 16:
+            self.withdrawn.discard(destination)
+        elif destination not in self.withdrawn:
+            self.withdrawn.add(destination)
+            self.add_penalty(destination)
+
+    def add_penalty(self, destination, now=None):
+        """
+            Adds a flap to the destination's penalty, suppressing its route once the penalty reaches the suppress limit.
+            A suppressed route has its reuse time pushed back to when the higher penalty will have decayed
+        """
+        if now is None:
+            now = self.clock.now()
+        penalty = min(self.get_penalty(destination, now) + FLAP_PENALTY, self.max_penalty)
+        self.penalties[destination] = (penalty, now)
+        self.flaps += 1
+        if destination not in self.suppressed:
+            if penalty < self.suppress_limit:
+                forget_time = now + self.half_life * math.log2(penalty / self.forget_limit)
+                self.forget_times[destination] = forget_time
+                heapq.heappush(self.forget_heap, (forget_time, destination))
+                return
+            self.suppressions += 1
+            self.forget_times.pop(destination, None)
+        reuse_time = now + self.half_life * math.log2(penalty / self.reuse_limit)
+        self.suppressed[destination] = reuse_time
+        heapq.heappush(self.reuse_heap, (reuse_time, destination))
+
+    def next_reuse_deadline(self):
+        """
+            Returns the clock time the next suppressed route is due to be reused or the next penalty is due to be
+            forgotten, or None if there are no penalties
+        """
+        deadline = None
+        for heap, times in ((self.reuse_heap, self.suppressed), (self.forget_heap, self.forget_times)):
+            while heap and times.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap) # Stale, the destination was penalized again, suppressed, reused or forgotten already
+            if heap and (deadline is None or heap[0][0] < deadline):
+                deadline = heap[0][0]
+        return deadline
+
+    def pop_reused(self, now=None):
+        """
+            Stops suppressing the routes whose reuse time has passed, forgetting their penalties, and forgets the
+            penalties of the other destinations that have decayed below the forget limit
+            :return: list of the destinations that are no longer suppressed
+        """
+        if now is None:
+            now = self.clock.now()
+        heap = self.forget_heap
+        while heap and heap[0][0] <= now:
+            forget_time, destination = heapq.heappop(heap)
+            if self.forget_times.get(destination) == forget_time:
+                self.forget_times.pop(destination, None)
+                del self.penalties[destination]
+                if self.routing_table.get_route_by_router(destination) is None:
+                    self.withdrawn.discard(destination) # Its route is gone, so there is no outage left to remember
+        reused = []
+        heap = self.reuse_heap
+        while heap and heap[0][0] <= now:
+            reuse_time, destination = heapq.heappop(heap)
+            if self.suppressed.get(destination) == reuse_time:
+                del self.suppressed[destination]
+                del self.penalties[destination]
+                reused.append(destination)
+        return reused
+
+    def get_stats(self, now=None):
+        """
+            Returns the damping counters and every suppressed route with its penalty and seconds until it is reused
+        """
+        if now is None:
+            now = self.clock.now()
+        return {
+            "flaps": self.flaps,
+            "suppressions": self.suppressions,
+            "penalized": len(self.penalties),
+            "suppressed": {str(destination): {"penalty": round(self.get_penalty(destination, now)), "reuse_in": round(reuse_time - now, 1)}
+                           for destination, reuse_time in sorted(self.suppressed.items())},
+        }
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+
+from ConfigParser import ConfigParser
+from Daemon import LOCAL_HOST
+from Simulator import find_config_files
+
+FIRST_PROXY_PORT = 40000 # Proxy ports are handed out counting up from here
+SETTINGS = ["loss", "latency", "jitter", "duplicate", "reorder", "bandwidth"] # Impairments that can be set for each link
+
+
+class LinkImpairment:
+    """
+        The impairments of one direction of a link and what they have done to its datagrams. Every datagram is dropped,
+        delayed, held back past the datagrams after it, or duplicated, and is serialized onto the link at the link's
+        bandwidth behind the datagrams before it
+    """
+    def __init__(self, loss=0, latency=0, jitter=0, duplicate=0, reorder=0, bandwidth=None, max_queue_delay=1):
+        """
+            :param loss: chance of dropping each datagram, from 0 to 1
+            :param latency: seconds every datagram is delayed by
+            :param jitter: most seconds added to or taken off each datagram's latency, at random
+            :param duplicate: chance of delivering a datagram twice
+            :param reorder: chance of holding a datagram back so the datagrams after it overtake it
+            :param bandwidth: bits per second the link can carry, None for no limit
+            :param max_queue_delay: most seconds a datagram waits for the bandwidth before it is dropped
+        """
+        self.loss = loss
+        self.latency = latency
+        self.jitter = jitter
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.bandwidth = bandwidth
+        self.max_queue_delay = max_queue_delay
+        self.up = True
+        self.free_at = 0 # Time the last datagram finishes being serialized onto the link
+        self.last_arrival = 0 # Arrival time of the last datagram that wasn't reordered, so jitter alone keeps the order
+        self.forwarded = 0
+        self.forwarded_bytes = 0
+        self.dropped = {"down": 0, "loss": 0, "queue": 0}
+        self.duplicated = 0
+        self.reordered = 0
+
+    def update(self, settings):
+        """
+            Changes the given impairments, leaving the rest as they are
+            :param settings: dictionary of impairment name to value, see __init__
+        """
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+    def schedule(self, now, size):
+        """
+            Works out what happens to a datagram of the given size sent over the link now
+            :return: list of the times each copy of the datagram arrives, empty if it is dropped
+        """
+        if not self.up:
+            self.dropped["down"] += 1
+            return []
+        if self.loss and random.random() < self.loss:
+            self.dropped["loss"] += 1
+            return []
+
+        departure = now
+        if self.bandwidth:
+            start = max(now, self.free_at)
+            if start - now > self.max_queue_delay:
+                self.dropped["queue"] += 1
+                return []
+            departure = self.free_at = start + size * 8 / self.bandwidth
+
+        arrival = departure + max(0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if self.reorder and random.random() < self.reorder:
+            arrival += max(self.latency, 0.01) # Held back long enough for the next datagrams to overtake it
+            self.reordered += 1
+        else:
+            arrival = self.last_arrival = max(arrival, self.last_arrival)
+
+        self.forwarded += 1
+        self.forwarded_bytes += size
+        if self.duplicate and random.random() < self.duplicate:
+            self.duplicated += 1
+            return [arrival, arrival]
+        return [arrival]
+
+    def get_stats(self):
+        """
+            Returns the link's state and counters as a dictionary
+        """
+        return {
+            "up": self.up,
+            "forwarded": self.forwarded,
+            "forwarded_bytes": self.forwarded_bytes,
+            "dropped": dict(self.dropped),
+            "duplicated": self.duplicated,
+            "reordered": self.reordered,
+        }
+
+
+class ProxyProtocol(asyncio.DatagramProtocol):
+    """
+        Datagram protocol for a single proxy port that hands every datagram to the proxy
+    """
+    def __init__(self, proxy, proxy_port):
+        """
+            Initializes the protocol for the given proxy and proxy port
+        """
+        self.proxy = proxy
+        self.proxy_port = proxy_port
+        self.transport = None
+
+    def connection_made(self, transport):
+        """
+            Keeps the transport so impaired datagrams can be sent on from the proxy port
+        """
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """
+            Called by the event loop as soon as a datagram arrives on the proxy port
+        """
+        self.proxy.datagram_received(self, data)
+
+
+class ImpairmentProxy:
+    """
+        A UDP proxy that sits between the routers on one machine. Each router's outputs are rewritten to send to a proxy
+        port of their own, and the proxy passes every datagram on to the neighbour's real input port with that link's
+        impairments applied. Links are named by the pair of router ids at their ends, and the impairments and up or
+        down state of a link apply to both of its directions
+    """
+    def __init__(self, configs, first_port=FIRST_PROXY_PORT, defaults=None, link_settings=None):
+        """
+            Hands out a proxy port for every output of every router
+            :param configs: dictionary of router id to (input ports, OutputLinks) as read by ConfigParser
+            :param first_port: the first proxy port, ports used by the configs are skipped
+            :param defaults: dictionary of the impairments of every link, see LinkImpairment
+            :param link_settings: dictionary of frozensets of two router ids to the impairments of that link, on top of the defaults
+        """
+        self.configs = configs
+        self.links = {} # LinkImpairment of each direction of each link, keyed by (sending router id, receiving router id)
+        self.routes = {} # (real input port, LinkImpairment) each proxy port forwards to
+        self.proxy_ports = {} # Proxy port of each (sending router id, receiving router id)
+        used_ports = {port for input_ports, _ in configs.values() for port in input_ports}
+        used_ports.update(link.port for _, output_links in configs.values() for link in output_links.links)
+        port = first_port
+        for router_id, (_, output_links) in sorted(configs.items()):
+            for link in output_links.links:
+                while port in used_ports:
+                    port += 1
+                if port > 64000:
+                    raise Exception("Error: Ran out of proxy ports, use a lower first port")
+                impairment = LinkImpairment(**(defaults or {}))
+                impairment.update((link_settings or {}).get(frozenset((router_id, link.router_id)), {}))
+                self.links[(router_id, link.router_id)] = impairment
+                self.routes[port] = (link.port, impairment)
+                self.proxy_ports[(router_id, link.router_id)] = port
+                port += 1
+        self.endpoints = []
+
+    def write_configs(self, directory, config_filenames):
+        """
+            Writes every router's config into the given directory with its outputs sending to its proxy ports. The
+            directory must not be the one a config was read from, so the original configs are never overwritten
+            :param config_filenames: dictionary of router id to the config file it was read from, for the file names
+            :return: list of the config file paths written
+        """
+        source_directories = {os.path.dirname(os.path.realpath(filename)) for filename in config_filenames.values()}
+        if os.path.realpath(directory) in source_directories:
+            raise Exception(f"Error: Output directory {directory} holds the original configs, which would be overwritten. Use another directory")
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for router_id, (input_ports, output_links) in sorted(self.configs.items()):
+            outputs = [f"{self.proxy_ports[(router_id, link.router_id)]}-{link.metric}-{link.router_id}" for link in output_links.links]
+            lines = [
+                f"router-id, {router_id}",
+                "input-ports, " + ", ".join(str(port) for port in input_ports),
+                "outputs, " + ", ".join(outputs),
+            ]
+            path = os.path.join(directory, os.path.basename(config_filenames[router_id]))
+            with open(path, "w") as config_file:
+                config_file.write("\n".join(lines) + "\n")
+            paths.append(path)
+        return paths
+
+    def get_directions(self, router_a, router_b):
+        """
+            Returns the LinkImpairment of both directions of the link between the two routers
+        """
+        directions = [self.links[key] for key in ((router_a, router_b), (router_b, router_a)) if key in self.links]
+        if not directions:
+            raise Exception(f"Error: There is no link between router {router_a} and router {router_b}")
+        return directions
+
+    def set_link_state(self, router_a, router_b, up):
+        """
+            Brings the link between the two routers up or down. Datagrams sent over a link that is down are dropped
+        """
+        for impairment in self.get_directions(router_a, router_b):
+            impairment.up = up
+        print(f"Link {router_a}-{router_b} {'up' if up else 'down'}", file=sys.stderr)
+
+    def update_link(self, router_a, router_b, settings):
+        """
+            Changes the impairments of the link between the two routers
+        """
+        for impairment in self.get_directions(router_a, router_b):
+            impairment.update(settings)
+        print(f"Link {router_a}-{router_b} set {settings}", file=sys.stderr)
+
+    def datagram_received(self, protocol, data):
+        """
+            Applies the link's impairments to a datagram that arrived on a proxy port, scheduling each copy that
+            survives to be sent on to the real input port
+        """
+        port, impairment = self.routes[protocol.proxy_port]
+        loop = asyncio.get_running_loop()
+        for arrival in impairment.schedule(loop.time(), len(data)):
+            loop.call_at(arrival, protocol.transport.sendto, data, (LOCAL_HOST, port))
+
+    async def start(self):
+        """
+            Binds every proxy port
+        """
+        loop = asyncio.get_running_loop()
+        for proxy_port in self.routes:
+            transport, _ = await loop.create_datagram_endpoint(lambda proxy_port=proxy_port: ProxyProtocol(self, proxy_port),
+                                                               local_addr=(LOCAL_HOST, proxy_port))
+            self.endpoints.append(transport)
+
+    def close(self):
+        """
+            Closes every proxy port
+        """
+        for transport in self.endpoints:
+            transport.close()
+        self.endpoints.clear()
+
+    def get_stats(self):
+        """
+            Returns the state and counters of every direction of every link, keyed by "sender>receiver"
+        """
+        return {f"{router_a}>{router_b}": impairment.get_stats() for (router_a, router_b), impairment in sorted(self.links.items())}
+
+
+def parse_link(text, line_num=None):
+    """
+        Parses a link named by the router ids at its ends, such as 1-2
+        :return: tuple of the two router ids
+    """
+    parts = text.split("-")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        raise Exception(f"Error: Invalid link '{text}'{f' on line {line_num}' if line_num else ''}. Correct format is '{{router id}}-{{router id}}'")
+    return int(parts[0]), int(parts[1])
+
+
+def parse_settings(words, line_num=None):
+    """
+        Parses impairments given as name=value words. Latency and jitter are in milliseconds and bandwidth in
+        kilobits per second, as on the command line
+        :return: dictionary of impairment name to value in the units LinkImpairment uses
+    """
+    settings = {}
+    for word in words:
+        name, _, value = word.partition("=")
+        if name not in SETTINGS or not value:
+            raise Exception(f"Error: Invalid impairment '{word}'{f' on line {line_num}' if line_num else ''}. "
+                            f"Correct format is '{{name}}={{value}}' with a name out of {', '.join(SETTINGS)}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise Exception(f"Error: Impairment '{word}'{f' on line {line_num}' if line_num else ''} must have a number as its value")
+        if name in ("loss", "duplicate", "reorder") and not 0 <= number <= 1:
+            raise Exception(f"Error: Impairment '{word}'{f' on line {line_num}' if line_num else ''} must be a chance between 0 and 1")
+        if number < 0:
+            raise Exception(f"Error: Impairment '{word}'{f' on line {line_num}' if line_num else ''} must not be negative")
+        if name in ("latency", "jitter"):
+            number /= 1000
+        elif name == "bandwidth":
+            number = number * 1000 if number else None
+        settings[name] = number
+    return settings
+
+
+def read_lines(filename):
+    """
+        Reads the non-empty lines of a links or script file with comments removed, as ConfigParser does for configs
+        :return: list of (line number, list of words) tuples
+    """
+    with open(filename) as lines_file:
+        lines = lines_file.read().splitlines()
+    words = [(line_num, line.split('#', 1)[0].split()) for line_num, line in enumerate(lines, 1)]
+    return [(line_num, line_words) for line_num, line_words in words if line_words]
+
+
+def read_link_settings(filename):
+    """
+        Reads a file of per link impairments, one link per line, such as '1-2 loss=0.1 latency=20'
+        :return: dictionary of frozensets of two router ids to impairments
+    """
+    link_settings = {}
+    for line_num, words in read_lines(filename):
+        link_settings[frozenset(parse_link(words[0], line_num))] = parse_settings(words[1:], line_num)
+    return link_settings
+
+
+def read_script(filename):
+    """
+        Reads a script of link events, one per line, each at a number of seconds after the proxy starts:
+        '10 down 1-2', '40 up 1-2' or '60 set 1-2 loss=0.3'
+        :return: list of (seconds, action, (router id, router id), impairments) tuples in order of time
+    """
+    events = []
+    for line_num, words in read_lines(filename):
+        if len(words) < 3 or words[1] not in ("up", "down", "set"):
+            raise Exception(f"Error: Invalid event on line {line_num}. Correct format is '{{seconds}} up|down|set {{router id}}-{{router id}} [{{name}}={{value}} ...]'")
+        try:
+            seconds = float(words[0])
+        except ValueError:
+            raise Exception(f"Error: Event on line {line_num} must start with a number of seconds")
+        settings = parse_settings(words[3:], line_num)
+        if words[1] != "set" and settings:
+            raise Exception(f"Error: Only set events take impairments, on line {line_num}")
+        events.append((seconds, words[1], parse_link(words[2], line_num), settings))
+    return sorted(events, key=lambda event: event[0])
+
+
+async def run_proxy(proxy, events, duration, report_interval):
+    """
+        Runs the proxy, carrying out the scripted link events at their times, until the duration is up or the proxy
+        is interrupted
+    """
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, lambda: stopped.done() or stopped.set_result(None))
+    await proxy.start()
+
+    for seconds, action, (router_a, router_b), settings in events:
+        if action == "set":
+            loop.call_later(seconds, proxy.update_link, router_a, router_b, settings)
+        else:
+            loop.call_later(seconds, proxy.set_link_state, router_a, router_b, action == "up")
+    if duration:
+        loop.call_later(duration, lambda: stopped.done() or stopped.set_result(None))
+
+    def report():
+        links = proxy.links.values()
+        dropped = sum(sum(impairment.dropped.values()) for impairment in links)
+        print(f"{sum(impairment.forwarded for impairment in links)} forwarded, {dropped} dropped, "
+              f"{sum(impairment.duplicated for impairment in links)} duplicated, {sum(impairment.reordered for impairment in links)} reordered, "
+              f"{sum(impairment.forwarded_bytes for impairment in links)} bytes", file=sys.stderr)
+        loop.call_later(report_interval, report)
+    if report_interval:
+        loop.call_later(report_interval, report)
+
+    try:
+        await stopped
+    finally:
+        proxy.close()
+
+
+def main(arguments):
+    """
+        Rewrites the configs to send through the proxy, then runs the proxy and prints every link's counters when it stops
+    """
+    random.seed(arguments.seed)
+    config_filenames = {}
+    configs = {}
+    for config_filename in find_config_files(arguments.configs):
+        router_id, input_ports, output_links = ConfigParser().read_config_file(config_filename)
+        if router_id in configs:
+            raise Exception(f"Error: Router id {router_id} is used by more than one config file")
+        configs[router_id] = (input_ports, output_links)
+        config_filenames[router_id] = config_filename
+
+    defaults = parse_settings([f"{name}={getattr(arguments, name)}" for name in SETTINGS if getattr(arguments, name) is not None])
+    link_settings = read_link_settings(arguments.links) if arguments.links else {}
+    events = read_script(arguments.script) if arguments.script else []
+    proxy = ImpairmentProxy(configs, arguments.first_port, defaults, link_settings)
+    for link in list(link_settings) + [event[2] for event in events]:
+        proxy.get_directions(*link) # Checks every link named in the files exists before starting
+    paths = proxy.write_configs(arguments.output_dir, config_filenames)
+    print(f"Wrote {len(paths)} configs sending through the proxy to {arguments.output_dir}, proxying {len(proxy.routes)} ports from {arguments.first_port}", file=sys.stderr)
+
+    asyncio.run(run_proxy(proxy, events, arguments.duration, arguments.report_interval))
+    output = json.dumps(proxy.get_stats(), indent=2)
+    if arguments.stats_file:
+        with open(arguments.stats_file, "w") as stats_file:
+            stats_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a UDP proxy between the routers that adds loss, delay, jitter, duplication, "
+                                                 "reordering and bandwidth limits to each link, and brings links up and down on a script")
+    parser.add_argument("configs", nargs="+", help="config files, or directories of config files")
+    parser.add_argument("--output-dir", required=True, help="directory to write the configs that send through the proxy to, run the daemons on these")
+    parser.add_argument("--first-port", type=int, default=FIRST_PROXY_PORT, help="first proxy port, one is used for every output of every router")
+    parser.add_argument("--loss", type=float, help="chance of dropping each datagram on every link")
+    parser.add_argument("--latency", type=float, help="milliseconds every datagram is delayed by")
+    parser.add_argument("--jitter", type=float, help="most milliseconds added to or taken off each datagram's latency")
+    parser.add_argument("--duplicate", type=float, help="chance of delivering each datagram twice")
+    parser.add_argument("--reorder", type=float, help="chance of holding each datagram back so later ones overtake it")
+    parser.add_argument("--bandwidth", type=float, help="kilobits per second each direction of every link can carry")
+    parser.add_argument("--links", help="file of per link impairments, one link per line such as '1-2 loss=0.1 latency=20'")
+    parser.add_argument("--script", help="file of link events such as '10 down 1-2', '40 up 1-2' or '60 set 1-2 loss=0.3'")
+    parser.add_argument("--duration", type=float, help="seconds to run for, until interrupted if not given")
+    parser.add_argument("--report-interval", type=float, default=10, help="seconds between summaries of the traffic on stderr, 0 for none")
+    parser.add_argument("--seed", type=int, help="seed for the impairments' random choices, so runs are repeatable")
+    parser.add_argument("--stats-file", help="file to write every link's counters to as JSON when the proxy stops, printed to stdout if not given")
+    main(parser.parse_args())
@@ -1,5 +1,7 @@
 class Link:
     """Class that represents a link between two neighbouring routers"""
+    __slots__ = ("port", "metric", "router_id")
+
     def __init__(self, port, metric, router_id):
         """
             Initializes a link object
@@ -0,0 +1,104 @@
+from Clock import *
+
+HELLO_MULTIPLIER = 3 # Hello intervals without hearing from a neighbour in fast hello mode before it is declared dead
+
+
+class NeighbourTable:
+    """
+        Tracks when each neighbour in the output links was last heard from, so a neighbour that has stopped sending is
+        noticed once, for all of its routes at the same time, instead of by every route through it timing out on its own.
+        A neighbour gets the normal dead interval until a hello is received from it, then a few of its own hello intervals
+    """
+    def __init__(self, output_links, dead_interval=30, clock=SYSTEM_CLOCK):
+        """
+            Initializes the table with every neighbour not yet heard from
+            :param output_links: OutputLinks object of the neighbours
+            :param dead_interval: seconds without hearing from a neighbour that doesn't send hellos before it is declared dead
+            :param clock: clock the neighbours' timers are read from
+        """
+        self.clock = clock
+        self.dead_interval = dead_interval
+        self.links = {} # Link to each neighbour router id
+        self.last_heard = {} # Time each neighbour that is alive was last heard from
+        self.dead = set() # Neighbours that were declared dead and haven't been heard from since
+        self.hello_intervals = {} # Hello interval of each live neighbour that has been heard sending hellos
+        self.timeouts = 0 # Number of times a neighbour was declared dead
+        self.reset_links(output_links)
+
+    def reset_links(self, output_links):
+        """
+            Switches to the given output links, forgetting the neighbours that are gone and keeping the timers of the rest
+        """
+        self.links = {link.router_id: link for link in output_links.links}
+        self.last_heard = {router_id: heard for router_id, heard in self.last_heard.items() if router_id in self.links}
+        self.dead &= set(self.links)
+        self.hello_intervals = {router_id: interval for router_id, interval in self.hello_intervals.items() if router_id in self.links}
+
+    def get_link(self, router_id):
+        """
+            Returns the link to the given neighbour, or None if the router isn't a neighbour
+        """
+        return self.links.get(router_id)
+
+    def is_alive(self, router_id):
+        """
+            Checks if the given neighbour has been heard from within the dead interval
+        """
+        return router_id in self.last_heard
+
+    def heard_from(self, router_id, now=None, hello_interval=None):
+        """
+            Records that a packet has just arrived from the given neighbour
+            :param hello_interval: the neighbour's hello interval if the packet was a hello, None otherwise
+            :return: True if the neighbour had been declared dead and has come back, False otherwise
+        """
+        self.last_heard[router_id] = now if now is not None else self.clock.now()
+        if hello_interval is not None:
+            self.hello_intervals[router_id] = hello_interval
+        if router_id in self.dead:
+            self.dead.discard(router_id)
+            return True
+        return False
+
+    def get_dead_interval(self, router_id):
+        """
+            Returns the seconds the given neighbour can go unheard before it is declared dead
+        """
+        hello_interval = self.hello_intervals.get(router_id)
+        return self.dead_interval if hello_interval is None else hello_interval * HELLO_MULTIPLIER
+
+    def next_deadline(self):
+        """
+            Returns the clock time the first live neighbour will be declared dead unless it is heard from, or None if
+            none are alive
+        """
+        if not self.hello_intervals:
+            return min(self.last_heard.values()) + self.dead_interval if self.last_heard else None
+        return min((heard + self.get_dead_interval(router_id) for router_id, heard in self.last_heard.items()), default=None)
+
+    def pop_dead(self, now=None):
+        """
+            Declares dead every neighbour that hasn't been heard from within its dead interval. A neighbour that comes
+            back gets the normal dead interval again until it is heard sending hellos
+            :return: list of the router ids of the neighbours that have just died
+        """
+        if now is None:
+            now = self.clock.now()
+        died = [router_id for router_id, heard in self.last_heard.items() if heard + self.get_dead_interval(router_id) <= now]
+        for router_id in died:
+            del self.last_heard[router_id]
+            self.hello_intervals.pop(router_id, None)
+            self.dead.add(router_id)
+        self.timeouts += len(died)
+        return died
+
+    def get_stats(self, now=None):
+        """
+            Returns whether each neighbour is alive and the seconds since it was last heard from
+        """
+        if now is None:
+            now = self.clock.now()
+        return {str(router_id): {"alive": router_id in self.last_heard,
+                                 "last_heard": round(now - self.last_heard[router_id], 1) if router_id in self.last_heard else None,
+                                 "hello_interval": self.hello_intervals.get(router_id)}
+                for router_id in sorted(self.links)}
@@ -0,0 +1,207 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from ConfigParser import *
+from Simulator import find_config_files
+
+INFINITY = 16
+
+
+class Oracle:
+    """
+        Computes the routing table every router should converge to, straight from the config files. The tables are
+        worked out with Bellman-Ford relaxation over whole matrices of metrics, one row per router and one column per
+        destination, so thousands of routers take seconds
+    """
+    def __init__(self, configs):
+        """
+            Builds the adjacency of the topology. A router learns routes from a neighbour when it lists the neighbour
+            in its outputs, and the neighbour sends to one of its input ports. The cost of the link is the metric the
+            learning router has configured for it
+            :param configs: dictionary of router id to (input ports, OutputLinks) as read by ConfigParser
+        """
+        links = [] # (router id, neighbour id, metric) of every link a router learns routes over
+        degrees = dict.fromkeys(configs, 0)
+        for router_id, (input_ports, output_links) in configs.items():
+            for link in output_links.links:
+                neighbour = configs.get(link.router_id)
+                if neighbour is None:
+                    continue
+                # The neighbour has to send back over a link this router is listening on
+                return_link = neighbour[1].get_link_by_router(router_id)
+                if return_link is not None and return_link.port in input_ports:
+                    links.append((router_id, link.router_id, link.metric))
+                    degrees[router_id] += 1
+
+        # Routers are numbered from the most neighbours to the fewest, so the routers that have an nth neighbour
+        # are always a slice of the rows at the top of the matrices
+        self.router_ids = sorted(configs, key=lambda router_id: (-degrees[router_id], router_id))
+        self.index = {router_id: i for i, router_id in enumerate(self.router_ids)}
+        self.degrees = [degrees[router_id] for router_id in self.router_ids]
+        self.link_metrics = {(self.index[router_id], self.index[neighbour_id]): metric for router_id, neighbour_id, metric in links}
+        self.metrics = None # Matrix of the metric from each router to each destination
+        self.next_hops = None # Matrix of the index of the next hop from each router to each destination, -1 if unreachable
+
+    def solve(self):
+        """
+            Relaxes the routes of every router over its nth neighbour at once, for each n, until no metric goes down.
+            Metrics are updated in place, so an improvement can spread several hops in one round. Every round that
+            changes anything lowers a metric that is capped at 16, so this takes at most 16 rounds
+        """
+        count = len(self.router_ids)
+        max_degree = max(self.degrees, default=0)
+        # Number of routers with more than n neighbours, which are the first rows of the matrices
+        rows_with_slot = [sum(1 for degree in self.degrees if degree > slot) for slot in range(max_degree)]
+
+        neighbours = np.zeros((count, max(max_degree, 1)), dtype=np.int32)
+        costs = np.full((count, max(max_degree, 1)), INFINITY, dtype=np.int16)
+        slots = [0] * count
+        for (router, neighbour), metric in self.link_metrics.items():
+            neighbours[router, slots[router]] = neighbour
+            costs[router, slots[router]] = metric
+            slots[router] += 1
+
+        diagonal = np.arange(count)
+        metrics = np.full((count, count), INFINITY, dtype=np.int16)
+        metrics[diagonal, diagonal] = 0
+        next_hops = np.full((count, count), -1, dtype=np.int32)
+        next_hops[diagonal, diagonal] = diagonal
+
+        for _ in range(INFINITY + 1):
+            changed = False
+            for slot, rows in enumerate(rows_with_slot):
+                candidate = costs[:rows, slot, None] + metrics[neighbours[:rows, slot]]
+                better = candidate < metrics[:rows]
+                if better.any():
+                    changed = True
+                    np.copyto(metrics[:rows], candidate, where=better)
+                    np.copyto(next_hops[:rows], neighbours[:rows, slot, None], where=better)
+            if not changed:
+                break
+
+        self.metrics = metrics
+        self.next_hops = next_hops
+
+    def get_tables(self):
+        """
+            Returns every router's expected routing table as {router id: {destination: (next hop, metric)}}, leaving out
+            the router itself and unreachable destinations
+        """
+        tables = {}
+        router_ids = self.router_ids
+        for router_id in sorted(router_ids):
+            router = self.index[router_id]
+            destinations = np.nonzero(self.metrics[router] < INFINITY)[0]
+            tables[router_id] = dict(sorted((router_ids[destination], (router_ids[self.next_hops[router, destination]], int(self.metrics[router, destination])))
+                                            for destination in destinations if destination != router))
+        return tables
+
+    def is_best_next_hop(self, router, next_hop, destination):
+        """
+            Checks if going through the given next hop reaches the destination at the lowest metric, so ties
+            between equally good next hops aren't reported as differences
+        """
+        metric = self.link_metrics.get((router, next_hop))
+        if metric is None:
+            return False
+        return min(metric + int(self.metrics[next_hop, destination]), INFINITY) == self.metrics[router, destination]
+
+    def diff(self, tables):
+        """
+            Compares routing table dumps against the expected tables. Routes with a metric of 16 are ignored as they are
+            only waiting to be removed, and only the routers in the dumps are compared
+            :param tables: dictionary of {router id: {destination: (next hop, metric)}}
+            :return: list of differences, each a dictionary with the router, destination, kind and values
+        """
+        differences = []
+        for router_id, table in sorted(tables.items()):
+            router = self.index.get(router_id)
+            if router is None:
+                differences.append({"router": router_id, "kind": "unknown_router"})
+                continue
+            reachable = {destination: route for destination, route in table.items() if route[1] < INFINITY}
+            for destination, (next_hop, metric) in sorted(reachable.items()):
+                column = self.index.get(destination)
+                if column is None or self.metrics[router, column] >= INFINITY:
+                    differences.append({"router": router_id, "destination": destination, "kind": "unexpected_route", "actual": [next_hop, metric]})
+                    continue
+                expected = [int(self.router_ids[self.next_hops[router, column]]), int(self.metrics[router, column])]
+                if metric != expected[1]:
+                    differences.append({"router": router_id, "destination": destination, "kind": "wrong_metric", "expected": expected, "actual": [next_hop, metric]})
+                elif next_hop not in self.index or not self.is_best_next_hop(router, self.index[next_hop], column):
+                    differences.append({"router": router_id, "destination": destination, "kind": "wrong_next_hop", "expected": expected, "actual": [next_hop, metric]})
+            for column in sorted(np.nonzero(self.metrics[router] < INFINITY)[0], key=lambda column: self.router_ids[column]):
+                destination = self.router_ids[column]
+                if column != router and destination not in reachable:
+                    differences.append({"router": router_id, "destination": destination, "kind": "missing_route",
+                                        "expected": [int(self.router_ids[self.next_hops[router, column]]), int(self.metrics[router, column])]})
+        return differences
+
+
+def load_configs(config_filenames):
+    """
+        Reads every config file with ConfigParser
+        :return: dictionary of router id to (input ports, OutputLinks)
+    """
+    configs = {}
+    for config_filename in config_filenames:
+        router_id, input_ports, output_links = ConfigParser().read_config_file(config_filename)
+        if router_id in configs:
+            raise Exception(f"Error: Router id {router_id} is used by more than one config file")
+        configs[router_id] = (set(input_ports), output_links)
+    return configs
+
+
+def load_tables(filenames):
+    """
+        Reads routing table dumps, either written by Simulator.py --dump-tables as {router id: {destination: [next hop, metric]}},
+        or a daemon's stats snapshot, which holds its router id and table
+        :return: dictionary of {router id: {destination: (next hop, metric)}}
+    """
+    tables = {}
+    for filename in filenames:
+        with open(filename) as dump_file:
+            dump = json.load(dump_file)
+        if "router_id" in dump and "table" in dump:
+            dump = {dump["router_id"]: dump["table"]}
+        for router_id, table in dump.items():
+            tables[int(router_id)] = {int(destination): (route[0], route[1]) for destination, route in table.items()}
+    return tables
+
+
+def main(arguments):
+    """
+        Computes the expected tables for the config files, then either writes them out or diffs them against the given dumps
+    """
+    start = time.perf_counter()
+    oracle = Oracle(load_configs(find_config_files(arguments.configs)))
+    oracle.solve()
+    print(f"Solved {len(oracle.router_ids)} routers in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if not arguments.dumps:
+        output = json.dumps({str(router_id): {str(destination): list(route) for destination, route in table.items()}
+                             for router_id, table in oracle.get_tables().items()})
+        if arguments.output:
+            with open(arguments.output, "w") as output_file:
+                output_file.write(output + "\n")
+        else:
+            print(output)
+        return 0
+
+    differences = oracle.diff(load_tables(arguments.dumps))
+    for difference in differences:
+        print(json.dumps(difference))
+    print(f"{len(differences)} differences", file=sys.stderr)
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes the routing tables a topology should converge to and checks dumped tables against them")
+    parser.add_argument("configs", nargs="+", help="config files, or directories of config files")
+    parser.add_argument("--dumps", nargs="+", help="routing table dumps to diff against the expected tables, from Simulator.py --dump-tables or the daemons' stats")
+    parser.add_argument("--output", help="file to write the expected tables to as JSON when not diffing, printed to stdout if not given")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+from struct import Struct
+
+CAPTURE_MAGIC = b"RIPCAP1\n" # Start of every capture file
+RECORD = Struct("!dHH") # Arrival time in seconds, input port and datagram length, followed by the datagram
+
+
+class PacketCapture:
+    """
+        Writes every datagram a daemon receives to a compact binary log, see read_capture for reading it back.
+        Each record is a 12 byte header holding the arrival time, input port and length, followed by the datagram itself
+    """
+    def __init__(self, filename):
+        """
+            Creates the capture file, replacing any file already at the given path
+        """
+        self.filename = filename
+        self.file = open(filename, "wb")
+        self.file.write(CAPTURE_MAGIC)
+        self.packets = 0
+
+    def write(self, timestamp, port, data):
+        """
+            Appends a datagram received on the given input port at the given clock time
+        """
+        self.file.write(RECORD.pack(timestamp, port, len(data)))
+        self.file.write(data)
+        self.packets += 1
+
+    def close(self):
+        """
+            Flushes and closes the capture file
+        """
+        self.file.close()
+
+
+def read_capture(filename):
+    """
+        Reads a capture file written by PacketCapture
+        :return: list of (arrival time, input port, datagram) tuples in the order they were received
+    """
+    with open(filename, "rb") as capture_file:
+        data = capture_file.read()
+    if not data.startswith(CAPTURE_MAGIC):
+        raise Exception(f"Error: {filename} is not a packet capture")
+
+    records = []
+    offset = len(CAPTURE_MAGIC)
+    while offset < len(data):
+        if offset + RECORD.size > len(data):
+            break # Capture was cut off part way through a record
+        timestamp, port, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break
+        records.append((timestamp, port, data[offset:offset + length]))
+        offset += length
+    return records
@@ -0,0 +1,173 @@
+import cProfile
+import json
+import time
+
+# Daemon methods timed once per call, by the name they are reported under
+DAEMON_PHASES = [
+    "receive_packets",
+    "process_packet",
+    "check_periodic_update_timer",
+    "check_hello_timer",
+    "check_route_timers",
+    "check_triggered_update_timer",
+    "send_rip_packets",
+    "send_triggered_update",
+]
+
+
+class LatencyHistogram:
+    """
+        Histogram of latencies in nanoseconds with power of two buckets. Bucket i counts latencies below 2 ** i ns
+    """
+    def __init__(self):
+        """
+            Initializes an empty histogram
+        """
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, nanoseconds):
+        """
+            Adds a latency to the histogram
+        """
+        if nanoseconds < 0:
+            nanoseconds = 0
+        self.buckets[nanoseconds.bit_length()] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def percentile(self, fraction):
+        """
+            Returns the upper bound in nanoseconds of the bucket holding the given fraction of the latencies
+        """
+        if self.count == 0:
+            return 0
+        target = fraction * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(2 ** bucket, self.max)
+        return self.max
+
+    def summary(self):
+        """
+            Returns the histogram as a dictionary that can be written out as JSON
+        """
+        return {
+            "count": self.count,
+            "mean_ns": self.total / self.count if self.count else 0,
+            "p50_ns": self.percentile(0.5),
+            "p90_ns": self.percentile(0.9),
+            "p99_ns": self.percentile(0.99),
+            "max_ns": self.max,
+            "buckets": {f"<{2 ** bucket}": bucket_count for bucket, bucket_count in enumerate(self.buckets) if bucket_count},
+        }
+
+
+class Profiler:
+    """
+        Opt-in profiling of a daemon. Times every phase of the run loop and every packet into latency histograms, and can
+        run cProfile over a window of the run. Nothing is timed unless a profiler has been attached to the daemon
+    """
+    def __init__(self, cprofile_file=None, cprofile_start=0, cprofile_duration=60):
+        """
+            Initializes the profiler
+            :param cprofile_file: file to write the cProfile stats to, None to not run cProfile
+            :param cprofile_start: seconds after the profiler is attached to start cProfile
+            :param cprofile_duration: seconds to run cProfile for
+        """
+        self.histograms = {}
+        self.cprofile_file = cprofile_file
+        self.cprofile = None
+        self.cprofile_start = None
+        self.cprofile_end = None
+        self.cprofile_delay = cprofile_start
+        self.cprofile_duration = cprofile_duration
+        self.daemon = None
+
+    def attach(self, daemon):
+        """
+            Replaces the daemon's phase methods, its display's update and its advertisement cache's encoding with timed wrappers
+        """
+        self.daemon = daemon
+        daemon.profiler = self
+        for name in DAEMON_PHASES:
+            setattr(daemon, name, self.timed(name, getattr(daemon, name)))
+        daemon.display.update = self.timed("display", daemon.display.update)
+        daemon.advertisement_cache.apply_pending = self.timed("encode", daemon.advertisement_cache.apply_pending)
+        if self.cprofile_file:
+            now = time.monotonic()
+            self.cprofile_start = now + self.cprofile_delay
+            self.cprofile_end = self.cprofile_start + self.cprofile_duration
+
+    def timed(self, name, function):
+        """
+            Wraps the function so every call's latency is recorded in the histogram with the given name.
+            Time receive_packets spends blocked in select is left out, so only the work of reading packets is counted
+        """
+        histogram = self.histograms.setdefault(name, LatencyHistogram())
+        daemon = self.daemon
+        perf_counter_ns = time.perf_counter_ns
+
+        if name == "receive_packets":
+            def timed_receive(*args, **kwargs):
+                start = perf_counter_ns()
+                result = function(*args, **kwargs)
+                histogram.record(perf_counter_ns() - start - int(daemon.select_wait * 1e9))
+                return result
+            return timed_receive
+
+        def timed_function(*args, **kwargs):
+            start = perf_counter_ns()
+            result = function(*args, **kwargs)
+            histogram.record(perf_counter_ns() - start)
+            return result
+        return timed_function
+
+    def tick(self):
+        """
+            Starts or stops cProfile when its window opens or closes. Called once per iteration of the run loop
+        """
+        if self.cprofile_start is None:
+            return
+        now = time.monotonic()
+        if self.cprofile is None and now >= self.cprofile_start:
+            self.start_cprofile()
+        elif self.cprofile is not None and now >= self.cprofile_end:
+            self.stop_cprofile()
+
+    def start_cprofile(self):
+        """
+            Starts running cProfile
+        """
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def stop_cprofile(self):
+        """
+            Stops cProfile and writes its stats to the cProfile file. It won't be started again
+        """
+        if self.cprofile is None:
+            return
+        self.cprofile.disable()
+        self.cprofile.dump_stats(self.cprofile_file)
+        self.cprofile = None
+        self.cprofile_start = None
+
+    def summary(self):
+        """
+            Returns every histogram as a dictionary that can be written out as JSON
+        """
+        return {name: histogram.summary() for name, histogram in self.histograms.items() if histogram.count}
+
+    def dump(self, filename):
+        """
+            Writes the histograms to the given file as JSON
+        """
+        with open(filename, "w") as profile_file:
+            profile_file.write(json.dumps(self.summary(), indent=2) + "\n")
@@ -0,0 +1,112 @@
+import struct
+
+COMMAND = 0x02  # As always a response packet
+REQUEST = 0x01  # Asks a neighbour to send its whole table straight away, sent when a daemon restarts
+VERSION = 0x02  # Version number is always 2 as stated in 4.2 of the assignment specification
+MAX_ENTRIES = 25  # The max number of entries in a single RIP message given in the RIP spec
+
+# Common header: command (1 byte), version (1 byte), source router id (2 bytes)
+HEADER = struct.Struct("!BBH")
+# Route entry: AFI (2 bytes), must be zero (2 bytes), router id (4 bytes), must be zero (8 bytes), metric (4 bytes)
+ENTRY = struct.Struct("!HHI8xI")
+
+
+def encode_header(src_id, command=COMMAND):
+    """
+    Encodes the common header of a RIP message
+    :param src_id: the source id of the router the packet is being sent from
+    :param command: the RIP command of the message
+    :return: bytes, the 4 byte common header
+    """
+    return HEADER.pack(command, VERSION, src_id)
+
+
+def encode_entry(router_id, metric):
+    """
+    Encodes a single RIP route entry
+    :param router_id: router_id of the router the entry concerns
+    :param metric: the cost metric of the path to the destination
+    :return: bytes, the 20 byte route entry
+    """
+    return ENTRY.pack(0, 0, router_id, metric)
+
+
+def encode_request(src_id):
+    """
+    Encodes a request for the receiver's whole routing table. As in section 3.9.1 of RFC 2453 it holds a single
+    entry with an AFI of zero and a metric of infinity
+    :param src_id: the source id of the router the packet is being sent from
+    :return: bytes, the request message
+    """
+    return encode_header(src_id, REQUEST) + ENTRY.pack(0, 0, 0, 16)
+
+
+def encode_hello(src_id, interval):
+    """
+    Encodes a hello, sent in fast hello mode only to show the sender is alive. Like a request it holds a single entry
+    with an AFI and router id of zero, and its metric field carries the sender's hello interval in milliseconds
+    :param src_id: the source id of the router the packet is being sent from
+    :param interval: seconds between the sender's hellos
+    :return: bytes, the hello message
+    """
+    return encode_header(src_id) + ENTRY.pack(0, 0, 0, round(interval * 1000))
+
+
+def decode_hello_interval(data):
+    """
+    Checks if a received response is a hello
+    :param data: bytes-like object containing a RIP response
+    :return: the sender's hello interval in seconds if the message is a hello, None otherwise
+    """
+    if len(data) != HEADER.size + ENTRY.size:
+        return None
+    afi, _, router_id, interval = ENTRY.unpack_from(data, HEADER.size)
+    if afi != 0 or router_id != 0 or interval == 0:
+        return None
+    return interval / 1000
+
+
+def join_entries(header, encoded_entries):
+    """
+    Splits already encoded route entries into as many RIP messages as are needed to hold them
+    :param header: bytes, the encoded common header to start every message with
+    :param encoded_entries: list of encoded 20 byte route entries
+    :return: list of RIP messages (bytes). Always holds at least one message, even if there are no entries
+    """
+    if len(encoded_entries) <= MAX_ENTRIES:
+        return [header + b"".join(encoded_entries)]
+    return [header + b"".join(encoded_entries[i:i + MAX_ENTRIES])
+            for i in range(0, len(encoded_entries), MAX_ENTRIES)]
+
+
+def encode_packets(src_id, entries):
+    """
+    Encodes a whole set of routes into as many RIP messages as are needed, with at most 25 entries each
+    :param src_id: the source id of the router the packets are being sent from
+    :param entries: iterable of (router_id, metric) tuples
+    :return: list of RIP messages (bytes)
+    """
+    pack = ENTRY.pack
+    return join_entries(encode_header(src_id), [pack(0, 0, router_id, metric) for router_id, metric in entries])
+
+
+def decode_header(data):
+    """
+    Decodes the common header of a received RIP message
+    :param data: bytes-like object containing a RIP message
+    :return: tuple of (command, version, source router id)
+    """
+    return HEADER.unpack_from(data)
+
+
+def iter_entries(data):
+    """
+    Iterates over the route entries of a received RIP message without copying them out of the buffer.
+    Any trailing bytes that don't make up a full entry are ignored
+    :param data: bytes-like object containing a RIP message
+    :return: iterator of (afi, must_be_zero, router_id, metric) tuples
+    """
+    end = HEADER.size + (len(data) - HEADER.size) // ENTRY.size * ENTRY.size
+    if end <= HEADER.size:
+        return iter(())
+    return ENTRY.iter_unpack(memoryview(data)[HEADER.size:end])
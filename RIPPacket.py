@@ -1,11 +1,11 @@
-COMMAND = 0x02  # As always a response packet
-VERSION = 0x02  # Version number is always 2 as stated in 4.2 of the assignment specification
+from RIPCodec import *
 
 
 class RIPPacket:
     """
     Python class that represents a RIP message
     """
+    __slots__ = ("src_id", "packet")
 
     def __init__(self, src_id):
         """
@@ -14,11 +14,7 @@ class RIPPacket:
         """
         if is_router_id_valid(src_id):
             self.src_id = src_id
-            self.packet = bytearray(4)
-            self.packet[0] = COMMAND
-            self.packet[1] = VERSION
-            self.packet[2] = src_id >> 8
-            self.packet[3] = (src_id & 0x00FF)
+            self.packet = bytearray(encode_header(src_id))
         else:
             print("Error: Failed to create RIP packet. Source router id is invalid")
             raise ValueError
@@ -31,41 +27,29 @@ class RIPPacket:
         :param metric: the cost metric of the path to the destination
         :return: the RIP packet (byte array) including the common header and packet entry(ies)
         """
-        rip_entry = bytearray(20)
-
         # Checks that there is not more than 25 entries in the message (The max given in the RIP spec)
-        if len(self.packet) > 500:
+        # Use RIPCodec.encode_packets to split larger tables across several messages
+        if len(self.packet) >= HEADER.size + MAX_ENTRIES * ENTRY.size:
             print('Cannot add more that 25 entries to a packet')
             return
 
         # Check for the value of the Router ID and print for debugging
-        if is_router_id_valid(router_id):
-            rip_entry[4] = router_id >> 24
-            rip_entry[5] = (router_id & 0x00FF0000) >> 16
-            rip_entry[6] = (router_id & 0x0000FF00) >> 8
-            rip_entry[7] = (router_id & 0x000000FF)
-        else:
+        if not is_router_id_valid(router_id):
             # Drop entry as invalid router id
             print("Dropped entry as invalid router id")
-            # return self.packet
+            router_id = 0
 
         # Check for the value of the metric and print for debugging
-        if is_metric_valid(metric):
-            rip_entry[16] = metric >> 24
-            rip_entry[17] = (metric & 0x00FF0000) >> 16
-            rip_entry[18] = (metric & 0x0000FF00) >> 8
-            rip_entry[19] = (metric & 0x000000FF)
-        else:
+        if not is_metric_valid(metric):
             # Drop the entry as invalid metric
             print("Dropped the entry as invalid metric")
-            # return self.packet
+            metric = 0
 
-        self.packet.extend(rip_entry)
-        # return self.packet
+        self.packet.extend(encode_entry(router_id, metric))
 
     def refresh_entries(self):
         """Reverts the message back to just the common header (deletes all entries)"""
-        self.packet = self.packet[:4]
+        self.packet = self.packet[:HEADER.size]
 
 
 def is_router_id_valid(router_id):
@@ -0,0 +1,111 @@
+import argparse
+import sys
+import time
+
+from Daemon import *
+
+
+class ReplayTransport:
+    """
+        Transport that binds no sockets and throws away everything the daemon sends, only counting it
+    """
+    def __init__(self):
+        """
+            Initializes the counters
+        """
+        self.sent_packets = 0
+        self.sent_bytes = 0
+
+    def bind(self, daemon, ports):
+        """
+            Nothing to bind, the replayed datagrams are handed straight to the daemon
+        """
+
+    def unbind(self, ports):
+        """
+            Nothing to unbind
+        """
+
+    def sendto(self, packet, port):
+        """
+            Counts a packet the daemon sent
+        """
+        self.sent_packets += 1
+        self.sent_bytes += len(packet)
+
+    def close(self):
+        """
+            Nothing to close
+        """
+
+
+def replay(daemon, records, speed=None, check_timers=True):
+    """
+        Feeds captured datagrams into the daemon. The daemon's virtual clock is moved to each datagram's arrival time
+        before it is handled, so its timers behave as they did when the traffic was captured
+        :param daemon: Daemon running on a VirtualClock with a ReplayTransport
+        :param records: list of (arrival time, input port, datagram) tuples, see read_capture
+        :param speed: how many times faster than real time to replay, None to replay as fast as possible
+        :param check_timers: whether to check the daemon's timers before each datagram, as its run loop would
+        :return: seconds spent replaying
+    """
+    clock = daemon.clock
+    first_timestamp = records[0][0] if records else 0
+    start = time.perf_counter()
+    for timestamp, port, data in records:
+        if speed:
+            delay = (timestamp - first_timestamp) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        clock.advance_to(timestamp)
+        if check_timers:
+            daemon.check_periodic_update_timer()
+            daemon.check_hello_timer()
+            daemon.check_route_timers()
+            daemon.check_triggered_update_timer()
+        daemon.handle_packet(data, port)
+    return time.perf_counter() - start
+
+
+def repeat_records(records, repeat):
+    """
+        Returns the records played back to back the given number of times, shifting the arrival times of each pass
+        to start after the previous one ends
+    """
+    if repeat <= 1 or not records:
+        return records
+    span = records[-1][0] - records[0][0] + 1
+    return [(timestamp + span * i, port, data) for i in range(repeat) for timestamp, port, data in records]
+
+
+def main(arguments):
+    """
+        Replays a capture into a daemon created from the given config file, then reports the packet rate and
+        prints the final routing table
+    """
+    records = repeat_records(read_capture(arguments.capture), arguments.repeat)
+    if not records:
+        raise Exception(f"Error: {arguments.capture} holds no packets")
+
+    transport = ReplayTransport()
+    daemon = Daemon(arguments.config_filename, transport, VirtualClock(records[0][0]))
+    daemon.reset_periodic_update_timer()
+    elapsed = replay(daemon, records, arguments.speed, not arguments.no_timers)
+
+    received_bytes = sum(len(data) for _, _, data in records)
+    packets_discarded = sum(daemon.stats.packets_discarded.values())
+    print(f"Replayed {len(records)} packets ({received_bytes} bytes, {records[-1][0] - records[0][0]:.1f}s of traffic) in {elapsed:.3f}s: "
+          f"{len(records) / elapsed if elapsed else 0:.0f} packets/s, {packets_discarded} discarded, {transport.sent_packets} sent", file=sys.stderr)
+    print(f"Router ID: {daemon.router_id}")
+    print(daemon.routing_table)
+    daemon.close_sockets()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replays a packet capture written with Daemon.py --capture into a daemon without sockets")
+    parser.add_argument("capture", help="capture file")
+    parser.add_argument("config_filename", help="config file of the router the capture was taken on")
+    parser.add_argument("--speed", type=float, help="replay this many times faster than the traffic was captured, as fast as possible if not given")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the capture this many times back to back")
+    parser.add_argument("--no-timers", action="store_true", help="only handle the packets, without checking the daemon's timers in between")
+    main(parser.parse_args())
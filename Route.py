@@ -1,71 +1,268 @@
-import datetime
-from gc import garbage
-import time
+from RouteStore import *
 
 
 class Route:
-    """A class that represents a RIPv2 route to destination node"""
-    def __init__(self, destination, next_hop, metric):
+    """
+        A class that represents a RIPv2 route to destination node. The route's state lives in a RouteStore, indexed by
+        its destination, so a route object only holds where to find it
+    """
+    __slots__ = ("store", "destination", "scheduled_deadline")
+
+    def __init__(self, destination, next_hop, metric, clock=SYSTEM_CLOCK, store=None):
+        """
+            Creates the route, storing it in the given RouteStore or in a store of its own
+        """
+        self.store = store if store is not None else RouteStore(clock)
         self.destination = destination
-        self.next_hop = next_hop
-        self.metric = metric
-        self.deletion_timer = datetime.datetime.now()
-        self.garbage_timer = None
-        self.timer_limit = 30 # Mark a route for deletion after 30 seconds of not being heard from, or remove a route if it has been marked for deletion for 30 seconds
-    
+        self.scheduled_deadline = None # Deadline the route is currently queued under in the routing table's timer heap
+        self.store.set(destination, next_hop, metric)
+
+    @property
+    def clock(self):
+        """
+            Clock all of the route's timers are read from
+        """
+        return self.store.clock
+
+    @property
+    def timer_limit(self):
+        """
+            Mark a route for deletion after 30 seconds of not being heard from, or remove a route if it has been marked for deletion for 30 seconds
+        """
+        return self.store.timer_limit
+
+    @property
+    def listener(self):
+        """
+            Routing table to notify when the advertised state of the route changes
+        """
+        return self.store.listener
+
+    @property
+    def next_hop(self):
+        """
+            Router id of the neighbour the route goes through
+        """
+        return self.store.next_hops[self.destination]
+
+    @next_hop.setter
+    def next_hop(self, next_hop):
+        self.store.next_hops[self.destination] = next_hop
+
+    @property
+    def next_hops(self):
+        """
+            Router ids of every equal-cost neighbour the route goes through, starting with next_hop
+        """
+        alternates = self.store.alternates.get(self.destination)
+        if alternates:
+            return [self.store.next_hops[self.destination], *alternates]
+        return [self.store.next_hops[self.destination]]
+
+    @property
+    def is_multipath(self):
+        """
+            Whether the route has more than one equal-cost next hop
+        """
+        return self.destination in self.store.alternates
+
+    @property
+    def metric(self):
+        """
+            Cost of the route, 16 if it is unreachable
+        """
+        return self.store.metrics[self.destination]
+
+    @metric.setter
+    def metric(self, metric):
+        self.store.metrics[self.destination] = metric
+
+    @property
+    def deletion_timer(self):
+        """
+            Time the route was last heard from, None once marked for deletion
+        """
+        deletion_timer = self.store.deletion_timers[self.destination]
+        return None if deletion_timer == NO_TIMER else deletion_timer
+
+    @property
+    def garbage_timer(self):
+        """
+            Time the route was marked for deletion, None if it hasn't been
+        """
+        garbage_timer = self.store.garbage_timers[self.destination]
+        return None if garbage_timer == NO_TIMER else garbage_timer
+
     def get_deletion_timer(self):
         """
             Converts the deletion timer into seconds
         """
-        if self.deletion_timer:
-            return (datetime.datetime.now() - self.deletion_timer).seconds
+        deletion_timer = self.store.deletion_timers[self.destination]
+        if deletion_timer != NO_TIMER:
+            return int(self.store.clock.now() - deletion_timer)
         return 0
 
     def get_garbage_timer(self):
         """
             Converts the garbage timer into seconds
         """
-        if self.garbage_timer:
-            return (datetime.datetime.now() - self.garbage_timer).seconds
+        garbage_timer = self.store.garbage_timers[self.destination]
+        if garbage_timer != NO_TIMER:
+            return int(self.store.clock.now() - garbage_timer)
         return 0
-        
+
+    def get_next_deadline(self):
+        """
+            Returns the clock time at which the route times out, or is removed if it has been marked for deletion
+        """
+        store = self.store
+        garbage_timer = store.garbage_timers[self.destination]
+        if garbage_timer != NO_TIMER:
+            return garbage_timer + store.timer_limit
+        return store.deletion_timers[self.destination] + store.timer_limit
+
     def reset_timers(self):
         """
             Resets the timers for the current route
             Used if the router receives information about the route
         """
-        self.deletion_timer = datetime.datetime.now()
-        self.garbage_timer = None
+        store = self.store
+        store.deletion_timers[self.destination] = store.clock.now()
+        store.garbage_timers[self.destination] = NO_TIMER
+        if store.provisional:
+            store.provisional.discard(self.destination)
+
+    def make_provisional(self, lifetime):
+        """
+            Marks the route as not yet confirmed by a neighbour. It times out after the given number of seconds
+            unless it is heard about again before then
+        """
+        store = self.store
+        store.deletion_timers[self.destination] = store.clock.now() - store.timer_limit + lifetime
+        store.provisional.add(self.destination)
+
+    def set_metric(self, metric):
+        """
+            Changes the metric without refreshing the timers, as when the cost of the link the route goes over changes
+        """
+        if self.store.metrics[self.destination] != metric:
+            self.store.metrics[self.destination] = metric
+            self.notify_changed()
+
+    def notify_changed(self, old_next_hops=None):
+        """
+            Tells the listening routing table that the metric, next hops or deletion state of the route has changed
+            :param old_next_hops: the route's next hops before the change if they have changed, None otherwise
+        """
+        if self.store.listener:
+            self.store.listener.route_changed(self.destination, old_next_hops)
+
+    def add_next_hop(self, next_hop):
+        """
+            Adds a neighbour that has advertised the route at the same metric as another next hop, or refreshes it if
+            it is one already. Nothing is added once the route has as many next hops as the store allows
+            :return: True if the next hop was added, False otherwise
+        """
+        store = self.store
+        alternates = store.alternates.get(self.destination)
+        if alternates is not None and next_hop in alternates:
+            alternates[next_hop] = store.clock.now()
+            return False
+        if next_hop == store.next_hops[self.destination] or len(alternates or ()) + 1 >= store.max_paths:
+            return False
+        old_next_hops = self.next_hops
+        store.alternates.setdefault(self.destination, {})[next_hop] = store.clock.now()
+        self.notify_changed(old_next_hops)
+        return True
+
+    def drop_next_hop(self, next_hop):
+        """
+            Stops using the given neighbour for the route. If it was the route's next hop, fails over straight away to
+            the equal-cost next hop heard from most recently, without waiting for the route to time out
+            :return: True if the route still has a next hop, False if the given one was its only one
+        """
+        store = self.store
+        alternates = store.alternates.get(self.destination)
+        if not alternates:
+            return next_hop != store.next_hops[self.destination]
+        old_next_hops = self.next_hops
+        if next_hop in alternates:
+            del alternates[next_hop]
+        elif next_hop == store.next_hops[self.destination]:
+            # Next hops not heard from within the timeout are no longer usable
+            oldest = store.clock.now() - store.timer_limit
+            heard_times = {alternate: heard for alternate, heard in alternates.items() if heard > oldest}
+            if not heard_times:
+                return False
+            new_next_hop = max(heard_times, key=heard_times.get)
+            del alternates[new_next_hop]
+            store.next_hops[self.destination] = new_next_hop
+            store.deletion_timers[self.destination] = heard_times[new_next_hop]
+        else:
+            return True
+        if not alternates:
+            del store.alternates[self.destination]
+        self.notify_changed(old_next_hops)
+        return True
+
+    def clear_alternates(self):
+        """
+            Forgets every next hop but next_hop
+            :return: the route's next hops before they were cleared, or None if it had no others
+        """
+        if self.destination not in self.store.alternates:
+            return None
+        old_next_hops = self.next_hops
+        del self.store.alternates[self.destination]
+        return old_next_hops
 
     def mark_for_deletion(self):
         """
             Marks the route for deletion by starting the garbage timer
         """
-        self.deletion_timer = None
-        self.garbage_timer = datetime.datetime.now()
-        self.metric = 16
-    
-    def check_timers(self):
+        store = self.store
+        old_next_hops = self.clear_alternates()
+        store.deletion_timers[self.destination] = NO_TIMER
+        store.garbage_timers[self.destination] = store.clock.now()
+        store.metrics[self.destination] = 16
+        store.provisional.discard(self.destination)
+        self.notify_changed(old_next_hops)
+
+    def check_timers(self, now=None):
         """
-            Checks if the timers have gone over their time threshold 
+            Checks if the timers have gone over their time threshold
             Returns an integer between 0 and 2.
             0: Route should be removed from table
             1: Route has been marked for deletion
             2: Route is okay
+            :param now: the current clock time, read from the clock if not given
         """
-        if self.get_garbage_timer() > self.timer_limit:
+        if now is None:
+            now = self.store.clock.now()
+        if now < self.get_next_deadline():
+            return 2
+        if self.store.garbage_timers[self.destination] != NO_TIMER:
             return 0
-        if self.get_deletion_timer() > self.timer_limit:
+        elif self.destination in self.store.alternates and self.drop_next_hop(self.store.next_hops[self.destination]):
+            return 2 # Failed over to another next hop that is still being heard from
+        else:
             self.mark_for_deletion()
             return 1
-        return 2
 
     def update_route(self, destination, next_hop, metric):
         """
-            Updates the route with the given information
+            Updates the route with the given information. A new next hop or metric replaces any equal-cost next hops
         """
+        store = self.store
+        old_next_hop = store.next_hops[destination]
+        changed = old_next_hop != next_hop or store.metrics[destination] != metric or store.garbage_timers[destination] != NO_TIMER
         self.destination = destination
-        self.next_hop = next_hop
-        self.metric = metric
+        old_next_hops = None
+        if old_next_hop != next_hop or store.metrics[destination] != metric:
+            old_next_hops = self.clear_alternates() or ([old_next_hop] if old_next_hop != next_hop else None)
+        store.next_hops[destination] = next_hop
+        store.metrics[destination] = metric
         self.reset_timers()
-        
+        if changed:
+            self.notify_changed(old_next_hops)
+
@@ -0,0 +1,35 @@
+import os
+from struct import Struct
+
+SNAPSHOT_MAGIC = b"RIPSNAP1" # Start of every snapshot file
+SNAPSHOT_HEADER = Struct("!HI") # Router id and number of routes
+SNAPSHOT_ENTRY = Struct("!HHB") # Destination, next hop and metric of a route
+
+
+def write_snapshot(filename, router_id, routing_table):
+    """
+        Writes the reachable routes of the routing table to a compact binary snapshot. The snapshot is written to a
+        temporary file first and then moved into place, so a crash part way through never leaves a broken snapshot
+    """
+    pack = SNAPSHOT_ENTRY.pack
+    entries = [pack(route.destination, route.next_hop, route.metric) for route in routing_table.routes if route.metric < 16]
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, "wb") as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC + SNAPSHOT_HEADER.pack(router_id, len(entries)) + b"".join(entries))
+    os.replace(temporary_filename, filename)
+
+
+def read_snapshot(filename):
+    """
+        Reads a snapshot written by write_snapshot
+        :return: tuple of (router id, list of (destination, next hop, metric) tuples)
+    """
+    with open(filename, "rb") as snapshot_file:
+        data = snapshot_file.read()
+    header_end = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size
+    if not data.startswith(SNAPSHOT_MAGIC) or len(data) < header_end:
+        raise Exception(f"Error: {filename} is not a routing table snapshot")
+    router_id, count = SNAPSHOT_HEADER.unpack_from(data, len(SNAPSHOT_MAGIC))
+    if len(data) != header_end + count * SNAPSHOT_ENTRY.size:
+        raise Exception(f"Error: Routing table snapshot {filename} is truncated")
+    return router_id, list(SNAPSHOT_ENTRY.iter_unpack(memoryview(data)[header_end:]))
@@ -0,0 +1,72 @@
+from array import array
+
+from Clock import *
+
+MAX_ROUTER_ID = 64000 # Router ids are 1 to 64000, see RIPPacket.is_router_id_valid
+NO_ROUTE = 0 # Next hop stored for router ids without a route
+NO_TIMER = float("-inf") # Stored in place of a timer that isn't running
+
+
+class RouteStore:
+    """
+        The state of every route in a routing table, held in parallel typed arrays indexed directly by destination
+        router id instead of in a Python object per route. The arrays start empty and grow to the largest router id
+        stored, so small networks only pay for the router ids they use
+    """
+    def __init__(self, clock=SYSTEM_CLOCK, timer_limit=30, max_paths=1):
+        """
+            Initializes an empty store
+            :param clock: clock all of the routes' timers are read from
+            :param timer_limit: seconds before an unheard route is marked for deletion, and before a route marked for
+                deletion is removed
+            :param max_paths: most equal-cost next hops kept for each route, 1 to keep only the best one
+        """
+        self.clock = clock
+        self.timer_limit = timer_limit
+        self.max_paths = max_paths
+        self.listener = None # Routing table to notify when the advertised state of a route changes
+        self.provisional = set() # Destinations of routes restored from a snapshot that no neighbour has confirmed yet
+        # Equal-cost next hops of each route besides the one in next_hops, each with the time it was last heard from.
+        # Only the few routes with more than one path have an entry
+        self.alternates = {}
+        self.metrics = array("B")
+        self.next_hops = array("H") # NO_ROUTE for router ids without a route
+        self.deletion_timers = array("d") # Time each route was last heard from, NO_TIMER once marked for deletion
+        self.garbage_timers = array("d") # Time each route was marked for deletion, NO_TIMER if it hasn't been
+
+    def reserve(self, router_id):
+        """
+            Grows the arrays, at least doubling them, so they can be indexed by the given router id
+        """
+        size = len(self.next_hops)
+        if router_id < size:
+            return
+        if not 0 < router_id <= MAX_ROUTER_ID:
+            raise Exception(f"Error: Router id {router_id} is out of range")
+        grow = min(max(router_id + 1, size * 2, 16), MAX_ROUTER_ID + 1) - size
+        self.metrics.frombytes(bytes(grow))
+        self.next_hops.frombytes(bytes(grow * self.next_hops.itemsize))
+        no_timers = array("d", [NO_TIMER]) * grow
+        self.deletion_timers.extend(no_timers)
+        self.garbage_timers.extend(no_timers)
+
+    def set(self, destination, next_hop, metric):
+        """
+            Stores a route for the given destination, heard from just now
+        """
+        self.reserve(destination)
+        self.next_hops[destination] = next_hop
+        self.metrics[destination] = metric
+        self.deletion_timers[destination] = self.clock.now()
+        self.garbage_timers[destination] = NO_TIMER
+
+    def clear(self, destination):
+        """
+            Forgets the route for the given destination
+        """
+        self.provisional.discard(destination)
+        self.alternates.pop(destination, None)
+        self.next_hops[destination] = NO_ROUTE
+        self.metrics[destination] = 0
+        self.deletion_timers[destination] = NO_TIMER
+        self.garbage_timers[destination] = NO_TIMER
@@ -0,0 +1,51 @@
+import heapq
+import itertools
+
+
+class RouteTimers:
+    """
+        A min-heap of route deadlines, so only routes whose timeout or garbage collection deadline has passed get checked.
+        Each route is queued under at most one live deadline (Route.scheduled_deadline), which is never later than its real
+        deadline. Refreshing a route pushes its deadline later, so instead of re-queuing on every refresh, a route popped
+        early is simply queued again under its real deadline. Making a route provisional or failing it over to an
+        equal-cost next hop can bring its deadline earlier, so those re-queue it straight away, leaving the old entry stale
+    """
+    def __init__(self):
+        """
+            Initializes an empty heap
+        """
+        self.heap = []
+        self.counter = itertools.count() # Tie breaker so routes themselves are never compared
+
+    def __len__(self):
+        """
+            Returns the number of queued deadlines
+        """
+        return len(self.heap)
+
+    def schedule(self, route, deadline):
+        """
+            Queues the route under the given deadline
+        """
+        route.scheduled_deadline = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter), route))
+
+    def next_deadline(self):
+        """
+            Returns the earliest queued deadline, or None if no routes are queued
+        """
+        if self.heap:
+            return self.heap[0][0]
+        return None
+
+    def pop_due(self, now):
+        """
+            Removes and returns the routes whose queued deadline is at or before the given time
+        """
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, route = heapq.heappop(self.heap)
+            if route.scheduled_deadline == deadline: # Otherwise the entry is stale
+                route.scheduled_deadline = None
+                due.append(route)
+        return due
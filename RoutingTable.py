@@ -1,4 +1,5 @@
 from Route import *
+from RouteTimers import *
 import sys
 
 
@@ -6,11 +7,25 @@ class RoutingTable:
     """
         A routing table that holds information about routes the router knows of
     """
-    def __init__(self):
+    def __init__(self, clock=SYSTEM_CLOCK, max_paths=1):
         """
-            Initializes the Routing Table with an empty list of routes
+            Initializes the Routing Table with no routes
+            :param clock: clock the route timers are read from
+            :param max_paths: most equal-cost next hops kept for each route
         """
-        self.routes = []
+        self.clock = clock
+        self.store = RouteStore(clock, max_paths=max_paths) # Metric, next hop and timers of every route, in arrays indexed by destination
+        self.store.listener = self
+        self.route_map = {} # Routes indexed by destination router id
+        self.next_hop_routes = {} # Destinations of the routes that use each next hop router id, equal-cost ones included
+        self.sorted_routes = [] # Routes in order of destination, rebuilt lazily when the table has changed
+        self.sorted_routes_valid = True
+        self.version = 0 # Incremented every time a route is added, changed or removed
+        self.routes_added = 0
+        self.routes_removed = 0
+        self.change_listeners = [] # Functions called with the destination of every route that is added, changed or removed
+        self.timers = RouteTimers() # Deadlines of the routes' timeout and garbage collection timers
+        self.flap_damping = None # Optional FlapDamping suppressing routes that keep flapping, see FlapDamping.py
 
     def __str__(self):
         """
@@ -24,49 +39,195 @@ class RoutingTable:
         ]
 
         for route in self.routes:
-            table.append("| {0:<14} | {1:<14} | {2:<14} | {3:<14} | {4:<14} |".format(route.destination, route.next_hop, route.metric, route.get_deletion_timer(), route.get_garbage_timer()))
+            next_hops = ",".join(str(next_hop) for next_hop in route.next_hops) if route.is_multipath else route.next_hop
+            table.append("| {0:<14} | {1:<14} | {2:<14} | {3:<14} | {4:<14} |".format(route.destination, next_hops, route.metric, route.get_deletion_timer(), route.get_garbage_timer()))
         table.append("+----------------+----------------+----------------+----------------+----------------+")
         return "\n".join(table)
 
+    def __len__(self):
+        """
+            Returns the number of routes in the table
+        """
+        return len(self.route_map)
+
+    @property
+    def routes(self):
+        """
+            Returns the list of routes in order of destination router id
+        """
+        if not self.sorted_routes_valid:
+            self.sorted_routes = [self.route_map[destination] for destination in sorted(self.route_map)]
+            self.sorted_routes_valid = True
+        return self.sorted_routes
+
     def check_route_known(self, router_id):
         """
             Checks if the given router exists in a route in the routing table
         """
-        return router_id in [route.destination for route in self.routes]
+        return router_id in self.route_map
 
     def add_route(self, destination, next_hop, metric):
         """
-            Adds a new route to the routing table then sorts the list to stay in order of router id
+            Adds a new route to the routing table
+        """
+        route = Route(destination, next_hop, metric, store=self.store)
+        self.route_map[destination] = route
+        self.next_hop_routes.setdefault(next_hop, set()).add(destination)
+        self.sorted_routes_valid = False
+        self.routes_added += 1
+        self.timers.schedule(route, route.get_next_deadline())
+        self.route_changed(destination)
+
+    def add_provisional_route(self, destination, next_hop, metric, lifetime):
+        """
+            Adds a route that hasn't been confirmed by a neighbour, such as one restored from a snapshot. It times out
+            after the given number of seconds unless a neighbour advertises it again
+        """
+        self.add_route(destination, next_hop, metric)
+        route = self.route_map[destination]
+        route.make_provisional(lifetime)
+        self.timers.schedule(route, route.get_next_deadline()) # Leaves the entry add_route queued stale
+
+    def remove_route(self, destination):
+        """
+            Removes the route for the given destination from the routing table if there is one
+        """
+        route = self.route_map.pop(destination, None)
+        if route is None:
+            return
+        route.scheduled_deadline = None # Leaves its entry in the timer heap stale
+        for next_hop in route.next_hops:
+            self.unindex_next_hop(destination, next_hop)
+        self.store.clear(destination)
+        self.sorted_routes_valid = False
+        self.routes_removed += 1
+        self.route_changed(destination)
+
+    def unindex_next_hop(self, destination, next_hop):
+        """
+            Removes the given destination from the set of routes that use the given next hop
+        """
+        destinations = self.next_hop_routes.get(next_hop)
+        if destinations is not None:
+            destinations.discard(destination)
+            if not destinations:
+                del self.next_hop_routes[next_hop]
+
+    def add_change_listener(self, listener):
+        """
+            Registers a function to be called with the destination of every route that is added, changed or removed
         """
-        self.routes.append(Route(destination, next_hop, metric))
-        self.routes = sorted(self.routes, key=lambda x: x.destination)
+        self.change_listeners.append(listener)
+
+    def route_changed(self, destination, old_next_hops=None):
+        """
+            Keeps the next hop index and timer heap up to date then passes on a change to the route for the given
+            destination to all the change listeners
+            :param old_next_hops: the route's next hops before the change if they have changed, None otherwise
+        """
+        if old_next_hops is not None:
+            route = self.route_map.get(destination)
+            next_hops = route.next_hops if route is not None else ()
+            for old_next_hop in old_next_hops:
+                if old_next_hop not in next_hops:
+                    self.unindex_next_hop(destination, old_next_hop)
+            for next_hop in next_hops:
+                self.next_hop_routes.setdefault(next_hop, set()).add(destination)
+            # Failing over to another next hop can bring the deadline forward, which the heap has to see
+            if route is not None and route.scheduled_deadline is not None and route.get_next_deadline() < route.scheduled_deadline:
+                self.timers.schedule(route, route.get_next_deadline())
+        self.version += 1
+        for listener in self.change_listeners:
+            listener(destination)
     
     def get_route_by_router(self, router_id):
         """
             Looks for a route with the given router_id and returns it if found, returns None otherwise
         """
-        for route in self.routes:
-            if route.destination == router_id:
-                return route
+        return self.route_map.get(router_id)
+
+    def get_routes_by_next_hop(self, next_hop):
+        """
+            Returns the list of routes that use the given router id as their next hop or one of their equal-cost next hops
+        """
+        return [self.route_map[destination] for destination in self.next_hop_routes.get(next_hop, ())]
+
+    def invalidate_next_hop(self, next_hop):
+        """
+            Stops using a neighbour that has gone down. Only the routes through it are touched: each fails over to an
+            equal-cost next hop if it has one and is marked for deletion otherwise. A route marked for deletion has a
+            garbage deadline later than the deadline it is queued under, so it is queued again when that comes up
+            :return: True if any route was changed, False otherwise
+        """
+        changed = False
+        for route in self.get_routes_by_next_hop(next_hop):
+            if route.garbage_timer is None:
+                if not route.drop_next_hop(next_hop):
+                    route.mark_for_deletion()
+                changed = True
+        return changed
 
-    def check_route_timers(self):
+    def next_timer_deadline(self):
+        """
+            Returns the clock time of the earliest route timer deadline, including the time the next suppressed route
+            is due to be reused, or None if there are no routes
         """
-            Runs through the routes in the table and marks them for deletion if the deletion timer is up.
-            Removes routes from the table if the route garbage collection timer is up
+        deadline = self.timers.next_deadline()
+        if self.flap_damping is not None:
+            reuse_deadline = self.flap_damping.next_reuse_deadline()
+            if reuse_deadline is not None and (deadline is None or reuse_deadline < deadline):
+                return reuse_deadline
+        return deadline
+
+    def check_reuse_timers(self, now=None):
         """
+            Stops suppressing the flapping routes that have been stable for long enough, so they are advertised again
+            :return: True if any route still in the table is no longer suppressed, False otherwise
+        """
+        if self.flap_damping is None:
+            return False
+        reused = False
+        for destination in self.flap_damping.pop_reused(now):
+            if destination in self.route_map:
+                self.route_changed(destination)
+                reused = True
+        return reused
+
+    def check_route_timers(self, now=None):
+        """
+            Marks routes for deletion if their deletion timer is up and removes routes from the table if their
+            garbage collection timer is up. Only the routes whose deadline has passed are checked.
+            When a neighbour is given up on, every route through it fails over to an equal-cost next hop if it has one,
+            and is marked for deletion at the same time otherwise, so they are all advertised at metric 16 in the next
+            triggered update instead of silently disappearing later
+            :param now: the current clock time, read from the clock if not given
+        """
+        if now is None:
+            now = self.clock.now()
         routes_to_remove = set()
+        dead_next_hops = set()
         send_updates = False
-        for i in range(len(self.routes)):
-            timer_check_result = self.routes[i].check_timers()
+        for route in self.timers.pop_due(now):
+            next_hop = route.next_hop
+            timer_check_result = route.check_timers(now)
             if timer_check_result == 0: # The route needs to be removed
-                # Add the route and any that use it as a next hop to the list of routes to remove
-                routes_to_remove.add(self.routes[i].destination)
-                [routes_to_remove.add(x.destination) if x.next_hop == self.routes[i].destination else '' for x in self.routes]
+                routes_to_remove.add(route.destination)
+                dead_next_hops.add(route.destination)
+            else:
+                # Route was refreshed since it was queued, has failed over or has just started its garbage timer
+                self.timers.schedule(route, route.get_next_deadline())
+                if route.next_hop != next_hop: # Failed over to an equal-cost next hop
+                    send_updates = True
+                if next_hop == route.destination and (timer_check_result == 1 or route.next_hop != next_hop): # The neighbour has stopped sending
+                    dead_next_hops.add(route.destination)
             if timer_check_result in [0, 1]:
                 send_updates = True
 
-        if len(routes_to_remove) > 0:
-            # Removes any route where the downed router is next hop router from self.routes
-            self.routes = [i for i in self.routes if i.destination not in routes_to_remove]
+        for next_hop in dead_next_hops:
+            if self.invalidate_next_hop(next_hop):
+                send_updates = True
+
+        for destination in routes_to_remove:
+            self.remove_route(destination)
         
         return send_updates
@@ -0,0 +1,95 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from RoutingTable import *
+
+TABLE_SIZES = [1000, 4000, 16000, 64000] # Up to the full 1-64000 router id space
+
+
+def time_per_operation(function, count):
+    """
+        Runs the given function and returns the average time it took per operation in microseconds
+    """
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def benchmark_table(size, neighbours=8):
+    """
+        Fills a routing table with the given number of routes spread over a set of neighbours, then times the
+        operations process_packet and the timer checks make on it
+    """
+    destinations = random.sample(range(1, 64001), size)
+    next_hops = destinations[:neighbours]
+    table = RoutingTable()
+
+    def add_routes():
+        for destination in destinations:
+            table.add_route(destination, random.choice(next_hops), random.randint(1, 15))
+
+    def lookup_routes():
+        # process_packet checks whether each received route is known and then fetches it
+        for destination in destinations:
+            if table.check_route_known(destination):
+                table.get_route_by_router(destination)
+
+    def update_routes():
+        for destination in destinations:
+            route = table.get_route_by_router(destination)
+            route.update_route(destination, random.choice(next_hops), random.randint(1, 15))
+
+    def sorted_view():
+        table.routes
+
+    def check_timers():
+        table.check_route_timers()
+
+    results = [
+        ("add_route", time_per_operation(add_routes, size)),
+        ("lookup", time_per_operation(lookup_routes, size)),
+        ("update_route", time_per_operation(update_routes, size)),
+        ("sorted view", time_per_operation(sorted_view, size)),
+        ("check timers", time_per_operation(check_timers, size)),
+    ]
+    print(f"{size:>6} routes: " + "  ".join(f"{name} {micros:.3f}us" for name, micros in results))
+
+
+def measure_memory(size, neighbours=8):
+    """
+        Returns the number of bytes allocated by a routing table filled with the given number of routes
+    """
+    destinations = random.sample(range(1, 64001), size)
+    next_hops = destinations[:neighbours]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table = RoutingTable()
+    for destination in destinations:
+        table.add_route(destination, random.choice(next_hops), random.randint(1, 15))
+    table.routes # Include the sorted view
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del table
+    return allocated
+
+
+def main(sizes):
+    """
+        Runs the routing table benchmark for each of the given table sizes
+    """
+    print("Average time per route for each operation")
+    for size in sizes:
+        benchmark_table(size)
+    print("Memory used by the routing table")
+    for size in sizes:
+        allocated = measure_memory(size)
+        print(f"{size:>6} routes: {allocated / 2 ** 20:.2f} MiB, {allocated / size:.0f} bytes per route")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main([int(size) for size in sys.argv[1:]])
+    else:
+        main(TABLE_SIZES)
@@ -0,0 +1,371 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from collections import deque
+
+from ConvergenceBenchmark import table_matches
+from Simulator import *
+from Topology import *
+
+
+class ShardNetwork(VirtualNetwork):
+    """
+        The part of a VirtualNetwork held by one shard. Datagrams to the shard's own routers are delivered in memory as
+        usual, datagrams to routers on other shards are held in an outbox for each shard until the coordinator collects them
+    """
+    def __init__(self, remote_ports, shard_count):
+        """
+            :param remote_ports: dictionary of the shard listening on every input port of a router on another shard
+            :param shard_count: number of shards in the whole simulation
+        """
+        super().__init__()
+        self.remote_ports = remote_ports
+        self.outboxes = [[] for _ in range(shard_count)] # Datagrams waiting to be sent to each shard
+        self.remote_packets = 0 # Datagrams sent to other shards
+        self.delivered_packets = 0 # Datagrams delivered to this shard's routers
+
+    def send(self, router_id, packet, port):
+        """
+            Queues a datagram from the given router to the given port, in the outbox of the shard listening on the
+            port if it is on another shard
+        """
+        shard = self.remote_ports.get(port)
+        if shard is None:
+            super().send(router_id, packet, port)
+            return
+        self.sent_packets[router_id] = self.sent_packets.get(router_id, 0) + 1
+        self.sent_bytes[router_id] = self.sent_bytes.get(router_id, 0) + len(packet)
+        self.remote_packets += 1
+        self.outboxes[shard].append((router_id, port, packet))
+
+    def deliver(self, limit=None):
+        """
+            Delivers the queued datagrams, counting them
+        """
+        delivered = super().deliver(limit)
+        self.delivered_packets += delivered
+        return delivered
+
+    def take_outboxes(self):
+        """
+            Returns the datagrams waiting for each shard and empties the outboxes
+        """
+        outboxes = self.outboxes
+        self.outboxes = [[] for _ in outboxes]
+        return outboxes
+
+
+def run_shard(connection, shard, shard_count, config_filenames, remote_ports, expected, seed):
+    """
+        Worker process running one shard's daemons. It carries out the coordinator's commands received over the
+        connection, one at a time, replying to each with the datagrams for the other shards, the shard's next timer
+        deadline and whether all its routers have converged
+        :param expected: dictionary of the metrics each of the shard's routers should converge to, None not to check
+    """
+    network = ShardNetwork(remote_ports, shard_count)
+    simulator = Simulator(config_filenames, VirtualClock(), network, seed=seed)
+    # Routers whose tables have changed since they were last compared against the expected metrics
+    changed_routers = set(simulator.daemons)
+    unmatched_routers = set(simulator.daemons)
+    for router_id, daemon in simulator.daemons.items():
+        daemon.routing_table.add_change_listener(lambda destination, router_id=router_id: changed_routers.add(router_id))
+
+    try:
+        while True:
+            command, *arguments = connection.recv()
+            if command == "start":
+                simulator.start()
+            elif command == "deliver":
+                now, inbox = arguments
+                simulator.clock.advance_to(now)
+                network.queue.extend(inbox)
+                network.deliver()
+            elif command == "timers":
+                simulator.check_timers()
+            elif command == "tables":
+                connection.send(simulator.get_tables())
+                continue
+            elif command == "stats":
+                connection.send({
+                    "routers": len(simulator.daemons),
+                    "packets_sent": sum(network.sent_packets.values()),
+                    "bytes_sent": sum(network.sent_bytes.values()),
+                    "remote_packets": network.remote_packets,
+                    "delivered_packets": network.delivered_packets,
+                    "cpu_time": time.process_time(),
+                })
+                continue
+            elif command == "stop":
+                break
+
+            converged = False
+            if expected is not None:
+                for router_id in changed_routers:
+                    if table_matches(simulator.daemons[router_id], expected):
+                        unmatched_routers.discard(router_id)
+                    else:
+                        unmatched_routers.add(router_id)
+                changed_routers.clear()
+                converged = not unmatched_routers
+            connection.send((network.take_outboxes(), simulator.get_next_deadline(), converged))
+    finally:
+        simulator.close()
+        connection.close()
+
+
+def read_router_ports(config_filenames):
+    """
+        Reads the router id, input ports and neighbours of every config file
+        :return: tuple of (dictionary of router id to config filename, dictionary of router id to input ports,
+            dictionary of router id to neighbour ids)
+    """
+    filenames = {}
+    input_ports = {}
+    neighbours = {}
+    for config_filename in config_filenames:
+        router_id, ports, output_links = ConfigParser().read_config_file(config_filename)
+        if router_id in filenames:
+            raise Exception(f"Error: Router id {router_id} is used by more than one config file")
+        filenames[router_id] = config_filename
+        input_ports[router_id] = ports
+        neighbours[router_id] = sorted(link.router_id for link in output_links.links)
+    return filenames, input_ports, neighbours
+
+
+def partition(neighbours, shard_count):
+    """
+        Splits the routers into shards of nearly equal size. The routers are ordered breadth first from the lowest
+        router id, so neighbouring routers mostly end up on the same shard and few datagrams cross between shards
+        :param neighbours: dictionary of router id to the ids of its neighbours
+        :return: list of the router ids on each shard
+    """
+    order = []
+    visited = set()
+    for root in sorted(neighbours):
+        if root in visited:
+            continue
+        visited.add(root)
+        queue = deque([root])
+        while queue:
+            router_id = queue.popleft()
+            order.append(router_id)
+            for neighbour_id in neighbours[router_id]:
+                if neighbour_id in neighbours and neighbour_id not in visited:
+                    visited.add(neighbour_id)
+                    queue.append(neighbour_id)
+    shard_size = -(-len(order) // shard_count)
+    return [order[start:start + shard_size] for start in range(0, len(order), shard_size)]
+
+
+class ShardedSimulator:
+    """
+        Runs the daemons of a large topology across a pool of worker processes, one shard of routers per worker, so
+        the simulation isn't held to a single core. All the shards move through the same virtual time in lockstep: at
+        every timer deadline the coordinator keeps handing each shard the datagrams sent to it by the other shards
+        until none are left, then has every shard check its timers, so each step does the same work as Simulator.step
+        however the routers are split. Datagrams between routers on the same shard never leave its process. The
+        workers are reached over multiprocessing pipes, which are local socketpairs
+    """
+    def __init__(self, config_filenames, workers, expected=None, seed=0):
+        """
+            Partitions the routers and starts a worker process for each shard
+            :param config_filenames: list of config filenames (or file paths), one per router
+            :param workers: number of worker processes to split the routers across
+            :param expected: optional dictionary of the metrics every router should converge to, see Topology.expected_metrics
+            :param seed: seed for the daemons' random timers, each daemon combines it with its router id
+        """
+        filenames, input_ports, neighbours = read_router_ports(config_filenames)
+        self.shards = partition(neighbours, max(1, min(workers, len(filenames))))
+        shard_of_port = {port: shard for shard, router_ids in enumerate(self.shards) for router_id in router_ids for port in input_ports[router_id]}
+        self.now = 0.0
+        self.steps = 0
+        self.pending = [[] for _ in self.shards] # Datagrams waiting to be delivered to each shard
+        self.deadlines = [None for _ in self.shards]
+        self.converged = False
+
+        self.connections = []
+        self.processes = []
+        for shard, router_ids in enumerate(self.shards):
+            remote_ports = {port: port_shard for port, port_shard in shard_of_port.items() if port_shard != shard}
+            shard_expected = None if expected is None else {router_id: expected.get(router_id, {}) for router_id in router_ids}
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_shard, daemon=True,
+                                              args=(worker_connection, shard, len(self.shards), [filenames[router_id] for router_id in router_ids],
+                                                    remote_ports, shard_expected, seed))
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def request(self, command, *arguments, inboxes=None):
+        """
+            Sends a command to every worker, then waits for all of their replies so the shards work in parallel
+            :param inboxes: optional list of the datagrams to hand each shard along with the command
+            :return: list of each shard's reply
+        """
+        for shard, connection in enumerate(self.connections):
+            connection.send((command, *arguments) if inboxes is None else (command, *arguments, inboxes[shard]))
+        return [connection.recv() for connection in self.connections]
+
+    def collect(self, replies):
+        """
+            Moves the datagrams in the workers' replies to the pending lists of the shards they're for
+        """
+        for outboxes, deadline, converged in replies:
+            for shard, outbox in enumerate(outboxes):
+                self.pending[shard].extend(outbox)
+
+    def start(self):
+        """
+            Has every daemon send its initial updates
+        """
+        self.collect(self.request("start"))
+
+    def step(self):
+        """
+            Steps every shard once at the current time, as Simulator.step does for a single process. The shards deliver
+            their datagrams, including the ones the other shards send while processing them, until none are left
+            anywhere, then check their timers. The datagrams sent when timers go off are delivered at the next step
+        """
+        while True:
+            inboxes = self.pending
+            self.pending = [[] for _ in self.shards]
+            self.collect(self.request("deliver", self.now, inboxes=inboxes))
+            if not any(self.pending):
+                break
+        replies = self.request("timers")
+        self.collect(replies)
+        self.deadlines = [deadline for _, deadline, _ in replies]
+        self.converged = all(converged for _, _, converged in replies)
+        self.steps += 1
+
+    def run(self, duration, until_converged=False):
+        """
+            Runs the simulation for the given number of virtual seconds, jumping from one timer deadline to the next
+            :param until_converged: stop as soon as every router's table matches the expected metrics
+            :return: whether the routers converged
+        """
+        end = self.now + duration
+        while True:
+            self.step()
+            if (until_converged and self.converged) or self.now >= end:
+                break
+            deadline = min((deadline for deadline in self.deadlines if deadline is not None), default=end)
+            self.now = min(max(deadline, self.now), end)
+        return self.converged
+
+    def get_tables(self):
+        """
+            Returns every router's routing table as {router id: {destination: (next hop, metric)}}
+        """
+        tables = {}
+        for shard_tables in self.request("tables"):
+            tables.update(shard_tables)
+        return tables
+
+    def get_stats(self):
+        """
+            Returns the packet counts and CPU time of each shard
+        """
+        return self.request("stats")
+
+    def close(self):
+        """
+            Stops the worker processes
+        """
+        for connection in self.connections:
+            connection.send(("stop",))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+
+def measure_scaling(config_filenames, workers, expected, duration, seed):
+    """
+        Runs the topology on the given number of workers until it converges, or for the given duration when there are
+        no expected metrics to converge to
+        :return: dictionary of the convergence time, wall time and packet throughput
+    """
+    setup_start = time.perf_counter()
+    simulator = ShardedSimulator(config_filenames, workers, expected, seed)
+    try:
+        setup_time = time.perf_counter() - setup_start
+        start = time.perf_counter()
+        simulator.start()
+        converged = simulator.run(duration, expected is not None)
+        wall_time = time.perf_counter() - start
+        stats = simulator.get_stats()
+    finally:
+        simulator.close()
+
+    delivered_packets = sum(shard["delivered_packets"] for shard in stats)
+    packets_sent = sum(shard["packets_sent"] for shard in stats)
+    return {
+        "workers": len(simulator.shards),
+        "routers": sum(shard["routers"] for shard in stats),
+        "converged": converged,
+        "convergence_time": simulator.now if converged else None,
+        "simulated_time": simulator.now,
+        "steps": simulator.steps,
+        "setup_time": setup_time,
+        "wall_time": wall_time,
+        "packets_sent": packets_sent,
+        "bytes_sent": sum(shard["bytes_sent"] for shard in stats),
+        "packets_delivered": delivered_packets,
+        "packets_per_second": delivered_packets / wall_time if wall_time else 0,
+        "cross_shard_fraction": sum(shard["remote_packets"] for shard in stats) / packets_sent if packets_sent else 0,
+        "worker_cpu_time_max": max(shard["cpu_time"] for shard in stats),
+    }
+
+
+def main(arguments):
+    """
+        Runs a generated topology, or the given config files, on each number of workers and reports how the
+        throughput and convergence time scale
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if arguments.configs:
+            name = "configs"
+            config_filenames = find_config_files(arguments.configs)
+            expected = None
+        else:
+            topology = TOPOLOGIES[arguments.topology](arguments.size)
+            name = topology.name
+            config_filenames = topology.write_configs(directory)
+            expected = topology.expected_metrics()
+
+        results = []
+        for workers in arguments.workers:
+            result = measure_scaling(config_filenames, workers, expected, arguments.duration, arguments.seed)
+            result["topology"] = name
+            result["speedup"] = results[0]["wall_time"] / result["wall_time"] if results and result["wall_time"] else 1.0
+            results.append(result)
+            if expected is None:
+                convergence_time = f"ran {result['simulated_time']:.2f}s"
+            else:
+                convergence_time = f"{result['convergence_time']:.2f}s" if result["converged"] else "did not converge"
+            print(f"{name:<12} {result['workers']:>3} workers {convergence_time:<18} {result['wall_time']:>8.2f}s wall "
+                  f"{result['packets_per_second']:>10.0f} packets/s {result['speedup']:>5.2f}x "
+                  f"{result['cross_shard_fraction'] * 100:>5.1f}% cross shard", file=sys.stderr)
+
+    output = json.dumps({"results": results}, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a large topology across a pool of worker processes and reports how it scales with the number of workers")
+    parser.add_argument("configs", nargs="*", help="config files, or directories of config files, to run instead of a generated topology")
+    parser.add_argument("--topology", choices=sorted(TOPOLOGIES), default="grid", help="topology to generate when no configs are given")
+    parser.add_argument("--size", type=int, default=400, help="number of routers in the generated topology")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4], help="numbers of worker processes to compare")
+    parser.add_argument("--duration", type=float, default=300, help="most virtual seconds to run for, or how long to run the given configs for")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the daemons' random timers, so runs are repeatable")
+    parser.add_argument("--output", help="file to write the JSON results to, printed to stdout if not given")
+    main(parser.parse_args())
@@ -0,0 +1,329 @@
+import argparse
+import glob
+import json
+import os
+import time
+from collections import deque
+
+from Daemon import *
+
+
+class VirtualNetwork:
+    """
+        An in-memory datagram network that connects the input ports of many daemons in the same process
+    """
+    def __init__(self):
+        """
+            Initializes an empty network
+        """
+        self.listeners = {} # Daemon listening on each input port
+        self.queue = deque() # Datagrams waiting to be delivered as (sending router id, port, packet)
+        self.down_links = set() # frozensets of the router id pairs whose links are down
+        self.sent_packets = {} # Number of packets sent by each router id
+        self.sent_bytes = {} # Number of bytes sent by each router id
+        self.dropped_packets = 0 # Packets sent to ports nobody listens on, or over links that are down
+        self.cpu_time = None # CPU seconds spent by each router id processing packets, None if not being measured
+
+    def bind(self, daemon, port):
+        """
+            Makes the given daemon receive the datagrams sent to the given port
+        """
+        if port in self.listeners:
+            raise Exception(f"Error: Port {port} is already bound by router {self.listeners[port].router_id}")
+        self.listeners[port] = daemon
+
+    def unbind(self, port):
+        """
+            Stops delivering datagrams sent to the given port
+        """
+        self.listeners.pop(port, None)
+
+    def send(self, router_id, packet, port):
+        """
+            Queues a datagram from the given router to the given port
+        """
+        self.sent_packets[router_id] = self.sent_packets.get(router_id, 0) + 1
+        self.sent_bytes[router_id] = self.sent_bytes.get(router_id, 0) + len(packet)
+        self.queue.append((router_id, port, packet))
+
+    def set_link_state(self, router_a, router_b, up):
+        """
+            Brings the link between the two given routers up or down. Datagrams sent over a link that is down are dropped
+        """
+        link = frozenset((router_a, router_b))
+        if up:
+            self.down_links.discard(link)
+        else:
+            self.down_links.add(link)
+
+    def deliver(self, limit=None):
+        """
+            Delivers the queued datagrams, including any sent while they are being processed
+            :param limit: the most datagrams to deliver, None to deliver until the queue is empty
+            :return: the number of datagrams delivered
+        """
+        delivered = 0
+        while self.queue and (limit is None or delivered < limit):
+            router_id, port, packet = self.queue.popleft()
+            daemon = self.listeners.get(port)
+            if daemon is None or (self.down_links and frozenset((router_id, daemon.router_id)) in self.down_links):
+                self.dropped_packets += 1
+                continue
+            if self.cpu_time is None:
+                daemon.handle_packet(packet, port)
+            else:
+                start = time.thread_time()
+                daemon.handle_packet(packet, port)
+                self.cpu_time[daemon.router_id] = self.cpu_time.get(daemon.router_id, 0) + time.thread_time() - start
+            delivered += 1
+        return delivered
+
+
+class VirtualTransport:
+    """
+        Transport for a single daemon on a VirtualNetwork, used in place of its UDP sockets
+    """
+    def __init__(self, network):
+        """
+            Initializes the transport for the given network
+        """
+        self.network = network
+        self.daemon = None
+        self.ports = []
+
+    def bind(self, daemon, ports):
+        """
+            Binds the given input ports of the daemon on the network
+        """
+        self.daemon = daemon
+        for port in ports:
+            self.network.bind(daemon, port)
+            self.ports.append(port)
+
+    def sendto(self, packet, port):
+        """
+            Sends a packet to the given port on the network
+        """
+        self.network.send(self.daemon.router_id, packet, port)
+
+    def unbind(self, ports):
+        """
+            Unbinds the given input ports of the daemon
+        """
+        for port in ports:
+            self.network.unbind(port)
+            self.ports.remove(port)
+
+    def close(self):
+        """
+            Unbinds all of the daemon's input ports
+        """
+        for port in self.ports:
+            self.network.unbind(port)
+        self.ports.clear()
+
+
+class Simulator:
+    """
+        Runs many daemons in one process connected by a VirtualNetwork
+    """
+    def __init__(self, config_filenames, clock=None, network=None, max_paths=1, flap_damping=None, hello_interval=None, seed=None):
+        """
+            Creates a daemon for every config file, all attached to the same virtual network
+            :param config_filenames: list of config filenames (or file paths), one per router
+            :param clock: optional VirtualClock shared by all the daemons. Without one the simulation runs in real time
+            :param network: optional VirtualNetwork to attach the daemons to, a new one is made if not given
+            :param max_paths: most equal-cost next hops each daemon keeps for a route
+            :param flap_damping: optional dictionary of FlapDamping settings to damp every daemon's routes with
+            :param hello_interval: optional seconds between hellos, to run every daemon in fast hello mode
+            :param seed: optional seed for every daemon's own random timers, so each router's timers are the same
+                however the routers are split between processes
+        """
+        self.network = network if network is not None else VirtualNetwork()
+        self.clock = clock if clock is not None else SYSTEM_CLOCK
+        self.daemons = {}
+        self.config_filenames = {} # Config file of each router id, for restarting routers
+        self.max_paths = max_paths
+        self.flap_damping = flap_damping
+        self.hello_interval = hello_interval
+        self.seed = seed
+        for config_filename in config_filenames:
+            daemon = self.create_daemon(config_filename)
+            if daemon.router_id in self.daemons:
+                raise Exception(f"Error: Router id {daemon.router_id} is used by more than one config file")
+            self.daemons[daemon.router_id] = daemon
+            self.config_filenames[daemon.router_id] = config_filename
+
+    def create_daemon(self, config_filename):
+        """
+            Creates a daemon for the given config file attached to the virtual network
+        """
+        daemon = Daemon(config_filename, VirtualTransport(self.network), self.clock, max_paths=self.max_paths, seed=self.seed)
+        if self.flap_damping is not None:
+            daemon.enable_flap_damping(**self.flap_damping)
+        if self.hello_interval is not None:
+            daemon.enable_fast_hello(self.hello_interval)
+        return daemon
+
+    def start(self):
+        """
+            Sends every daemon's initial updates, as Daemon.run_rip_daemon does
+        """
+        for daemon in self.daemons.values():
+            daemon.send_startup_packets()
+            daemon.reset_periodic_update_timer()
+
+    def measure_cpu_time(self):
+        """
+            Starts recording the CPU time each router spends processing packets and checking its timers
+        """
+        self.network.cpu_time = {router_id: 0 for router_id in self.daemons}
+
+    def step(self):
+        """
+            Delivers all queued datagrams then checks every daemon's timers once
+        """
+        self.network.deliver()
+        self.check_timers()
+
+    def check_timers(self):
+        """
+            Checks every daemon's timers once, sending any updates that are due
+        """
+        cpu_time = self.network.cpu_time
+        for daemon in self.daemons.values():
+            if cpu_time is not None:
+                start = time.thread_time()
+            daemon.check_periodic_update_timer()
+            daemon.check_hello_timer()
+            daemon.check_route_timers()
+            daemon.check_triggered_update_timer()
+            if cpu_time is not None:
+                cpu_time[daemon.router_id] = cpu_time.get(daemon.router_id, 0) + time.thread_time() - start
+
+    def is_virtual(self):
+        """
+            Checks if the simulation runs on a virtual clock rather than in real time
+        """
+        return isinstance(self.clock, VirtualClock)
+
+    def get_next_deadline(self):
+        """
+            Returns the earliest timer deadline of all the daemons, or None if there are no daemons
+        """
+        return min((daemon.get_next_deadline() for daemon in self.daemons.values()), default=None)
+
+    def advance(self, limit=None):
+        """
+            Discrete event driver: jumps the virtual clock straight to the earliest timer deadline of all the daemons
+            :param limit: clock time not to move past
+            :return: False if there was no deadline before the limit to jump to, True otherwise
+        """
+        deadline = self.get_next_deadline()
+        if deadline is None or (limit is not None and deadline > limit):
+            if limit is not None:
+                self.clock.advance_to(limit)
+            return False
+        self.clock.advance_to(deadline)
+        return True
+
+    def run(self, duration, tick=0.05):
+        """
+            Runs the simulation for the given number of seconds. On a virtual clock the simulation jumps from one timer
+            deadline to the next, otherwise it runs in real time
+            :param tick: seconds to sleep between steps when running in real time
+        """
+        end = self.clock.now() + duration
+        while self.clock.now() < end:
+            self.step()
+            if self.is_virtual():
+                self.advance(end)
+            else:
+                time.sleep(tick)
+        self.step()
+
+    def kill_router(self, router_id):
+        """
+            Stops the given router as if its process had died
+        """
+        daemon = self.daemons.pop(router_id)
+        daemon.close_sockets()
+
+    def restart_router(self, router_id, snapshot_file=None):
+        """
+            Starts a new daemon for a router that was killed, as if its process had been started again
+            :param snapshot_file: optional routing table snapshot for the daemon to warm restart from
+        """
+        daemon = self.create_daemon(self.config_filenames[router_id])
+        if snapshot_file is not None:
+            daemon.snapshot_file = snapshot_file
+            daemon.restore_snapshot()
+        self.daemons[router_id] = daemon
+        daemon.send_startup_packets()
+        daemon.reset_periodic_update_timer()
+
+    def set_link_state(self, router_a, router_b, up):
+        """
+            Brings the link between the two given routers up or down
+        """
+        self.network.set_link_state(router_a, router_b, up)
+
+    def get_tables(self):
+        """
+            Returns every router's routing table as {router id: {destination: (next hop, metric)}}
+        """
+        return {router_id: {route.destination: (route.next_hop, route.metric) for route in daemon.routing_table.routes}
+                for router_id, daemon in self.daemons.items()}
+
+    def dump_tables(self, filename):
+        """
+            Writes every router's routing table to the given file as JSON, in the format Oracle.py reads
+        """
+        tables = {str(router_id): {str(destination): list(route) for destination, route in table.items()}
+                  for router_id, table in self.get_tables().items()}
+        with open(filename, "w") as dump_file:
+            dump_file.write(json.dumps(tables) + "\n")
+
+    def close(self):
+        """
+            Stops all the daemons
+        """
+        for daemon in self.daemons.values():
+            daemon.close_sockets()
+
+
+def find_config_files(paths):
+    """
+        Expands the given list of config files and directories into a sorted list of config files
+    """
+    config_filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            config_filenames.extend(sorted(glob.glob(os.path.join(path, "*.txt"))))
+        else:
+            config_filenames.append(path)
+    return config_filenames
+
+
+def main(arguments):
+    """
+        Runs the simulator for the given config files then prints every router's routing table
+    """
+    simulator = Simulator(find_config_files(arguments.configs), None if arguments.real_time else VirtualClock())
+    simulator.start()
+    simulator.run(arguments.duration)
+    for router_id, daemon in sorted(simulator.daemons.items()):
+        print(f"Router ID: {router_id}")
+        print(daemon.routing_table)
+    if arguments.dump_tables:
+        simulator.dump_tables(arguments.dump_tables)
+    simulator.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs many RIP daemons in one process over an in-memory network")
+    parser.add_argument("configs", nargs="+", help="config files, or directories of config files")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run the simulation for")
+    parser.add_argument("--real-time", action="store_true", help="run in real time instead of jumping between timer deadlines on a virtual clock")
+    parser.add_argument("--dump-tables", help="file to write every router's final routing table to as JSON, for Oracle.py")
+    main(parser.parse_args())
@@ -0,0 +1,244 @@
+import json
+import os
+import socket
+import stat
+import time
+
+STATS_SEND_TIMEOUT = 5 # Seconds a client has to read its snapshot before it is disconnected
+
+
+class DaemonStats:
+    """
+        Counters and gauges describing what a daemon has been doing. Everything on the packet path is a plain integer
+        increment, the rest is worked out when a snapshot is asked for
+    """
+    def __init__(self, daemon):
+        """
+            Initializes all counters to zero for the given daemon's ports
+        """
+        self.daemon = daemon
+        self.start_time = time.time()
+        self.received_packets = {port: 0 for port in daemon.input_ports}
+        self.received_bytes = {port: 0 for port in daemon.input_ports}
+        self.sent_packets = {port: 0 for port in daemon.output_links.get_ports_list()}
+        self.sent_bytes = {port: 0 for port in daemon.output_links.get_ports_list()}
+        self.packets_discarded = {} # Number of packets discarded for each reason
+        self.entries_discarded = {} # Number of route entries discarded for each reason
+        self.periodic_updates = 0
+        self.triggered_updates = 0
+        self.requests_sent = 0 # Requests for the neighbours' whole tables, sent on a warm restart or when a dead neighbour comes back
+        self.requests_received = 0
+        self.config_reloads = 0
+        self.hellos_sent = 0 # Hellos sent to every neighbour in fast hello mode
+        self.loop_iterations = 0
+        self.last_loop_latency = 0 # Seconds the last loop iteration (or received packet in asyncio mode) spent working, not counting time blocked waiting for packets
+        self.max_loop_latency = 0
+
+    def packet_received(self, port, size):
+        """
+            Counts a packet received on the given input port
+        """
+        self.received_packets[port] = self.received_packets.get(port, 0) + 1
+        self.received_bytes[port] = self.received_bytes.get(port, 0) + size
+
+    def packet_sent(self, port, size):
+        """
+            Counts a packet sent to the given output port
+        """
+        self.sent_packets[port] = self.sent_packets.get(port, 0) + 1
+        self.sent_bytes[port] = self.sent_bytes.get(port, 0) + size
+
+    def packet_discarded(self, reason):
+        """
+            Counts a packet that was discarded for the given reason
+        """
+        self.packets_discarded[reason] = self.packets_discarded.get(reason, 0) + 1
+
+    def entry_discarded(self, reason):
+        """
+            Counts a route entry that was discarded for the given reason
+        """
+        self.entries_discarded[reason] = self.entries_discarded.get(reason, 0) + 1
+
+    def loop_finished(self, latency):
+        """
+            Records how long a loop iteration spent working
+        """
+        self.loop_iterations += 1
+        self.last_loop_latency = latency
+        if latency > self.max_loop_latency:
+            self.max_loop_latency = latency
+
+    def snapshot(self):
+        """
+            Returns all the counters and gauges as a dictionary that can be written out as JSON
+        """
+        routing_table = self.daemon.routing_table
+        return {
+            "router_id": self.daemon.router_id,
+            "uptime": time.time() - self.start_time,
+            "received": {str(port): {"packets": self.received_packets[port], "bytes": self.received_bytes[port]} for port in self.received_packets},
+            "sent": {str(port): {"packets": self.sent_packets[port], "bytes": self.sent_bytes[port]} for port in self.sent_packets},
+            "packets_discarded": dict(self.packets_discarded),
+            "entries_discarded": dict(self.entries_discarded),
+            "periodic_updates": self.periodic_updates,
+            "triggered_updates": self.triggered_updates,
+            "triggered_update_damping": self.daemon.triggered_updates.get_stats(),
+            "requests": {"sent": self.requests_sent, "received": self.requests_received},
+            "config_reloads": self.config_reloads,
+            "hellos_sent": self.hellos_sent,
+            "neighbour_timeouts": self.daemon.neighbours.timeouts,
+            "neighbours": self.daemon.neighbours.get_stats(),
+            "routes": {
+                "added": routing_table.routes_added,
+                "updated": routing_table.version - routing_table.routes_added - routing_table.routes_removed,
+                "deleted": routing_table.routes_removed,
+                "table_size": len(routing_table),
+                "provisional": len(routing_table.store.provisional),
+                "multipath": len(routing_table.store.alternates),
+            },
+            "flap_damping": routing_table.flap_damping.get_stats() if routing_table.flap_damping is not None else None,
+            "table": {str(route.destination): [route.next_hop, route.metric] for route in routing_table.routes},
+            "loop": {
+                "iterations": self.loop_iterations,
+                "last_latency": self.last_loop_latency,
+                "max_latency": self.max_loop_latency,
+            },
+        }
+
+    def snapshot_with_profile(self):
+        """
+            Returns a snapshot of the stats, including the profiler's latency histograms if the daemon is being profiled
+        """
+        snapshot = self.snapshot()
+        if self.daemon.profiler is not None:
+            snapshot["profile"] = self.daemon.profiler.summary()
+        return snapshot
+
+    def to_json(self):
+        """
+            Returns a snapshot of the stats as a JSON string
+        """
+        return json.dumps(self.snapshot_with_profile(), indent=2)
+
+    def dump(self, filename):
+        """
+            Writes a snapshot of the stats to the given file
+        """
+        with open(filename, "w") as stats_file:
+            stats_file.write(self.to_json() + "\n")
+
+
+class StatsServer:
+    """
+        Serves the daemon's stats as JSON over a local UNIX domain socket. Every client that connects is sent one
+        snapshot and then disconnected, e.g. `nc -U /tmp/rip1.sock`. Snapshots are sent without blocking: whatever
+        doesn't fit in the client's socket buffer is sent as the client reads it, and a client that hasn't read it all
+        within STATS_SEND_TIMEOUT seconds is disconnected, so a client that never reads can't stall the daemon
+    """
+    def __init__(self, stats, path):
+        """
+            Creates the listening socket at the given path, replacing a stale socket left there by an earlier daemon
+        """
+        self.stats = stats
+        self.path = path
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise Exception(f"Error: Stats socket path {path} already exists and is not a socket")
+            os.unlink(path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(path)
+        self.socket.listen()
+        self.socket.setblocking(False)
+        self.clients = {} # Rest of the snapshot waiting to be sent to each client, with the time to give up on it
+        self.loop = None # asyncio event loop the clients wait to be writable on, None when the daemon selects on them itself
+
+    def fileno(self):
+        """
+            Returns the file descriptor of the listening socket, so the server can be passed to select
+        """
+        return self.socket.fileno()
+
+    def set_loop(self, loop):
+        """
+            Switches to waiting for the clients to be writable on the given asyncio event loop, or on the daemon's own
+            select loop if None
+        """
+        for client in self.clients:
+            if self.loop is not None:
+                self.loop.remove_writer(client)
+            if loop is not None:
+                loop.add_writer(client, self.send, client)
+        self.loop = loop
+
+    def get_waiting_clients(self):
+        """
+            Returns the clients that still have some of their snapshot to be sent, for the daemon to select on
+        """
+        return list(self.clients)
+
+    def handle(self):
+        """
+            Accepts any waiting clients and starts sending each of them a snapshot of the stats
+        """
+        while True:
+            try:
+                client, _ = self.socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.setblocking(False)
+            self.clients[client] = (memoryview(self.stats.to_json().encode() + b"\n"), time.monotonic() + STATS_SEND_TIMEOUT)
+            if self.loop is not None:
+                self.loop.add_writer(client, self.send, client)
+                self.loop.call_later(STATS_SEND_TIMEOUT, self.drop_client, client)
+            self.send(client)
+
+    def send(self, client):
+        """
+            Sends as much of the rest of the client's snapshot as its socket buffer takes, disconnecting the client once
+            it has all been sent
+        """
+        data, give_up_time = self.clients[client]
+        try:
+            sent = client.send(data)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.drop_client(client)
+            return
+        if sent == len(data):
+            self.drop_client(client)
+        else:
+            self.clients[client] = (data[sent:], give_up_time)
+
+    def send_waiting(self, writable_clients):
+        """
+            Carries on sending to the clients select found writable, and disconnects the clients that have run out of time
+        """
+        for client in writable_clients:
+            if client in self.clients:
+                self.send(client)
+        now = time.monotonic()
+        for client, (_, give_up_time) in list(self.clients.items()):
+            if give_up_time <= now:
+                self.drop_client(client)
+
+    def drop_client(self, client):
+        """
+            Disconnects the given client, if it hasn't been disconnected already
+        """
+        if self.clients.pop(client, None) is None:
+            return
+        if self.loop is not None:
+            self.loop.remove_writer(client)
+        client.close()
+
+    def close(self):
+        """
+            Disconnects every client, closes the listening socket and removes its file
+        """
+        for client in list(self.clients):
+            self.drop_client(client)
+        self.socket.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,184 @@
+import heapq
+import os
+import random
+
+FIRST_PORT = 10000 # Ports for generated configs are handed out counting up from here
+INFINITY = 16
+
+
+class Topology:
+    """
+        An undirected graph of routers and link metrics that can be written out as router config files
+    """
+    def __init__(self, name):
+        """
+            Initializes an empty topology with the given name
+        """
+        self.name = name
+        self.routers = []
+        self.links = {} # Metric of each link, keyed by (lower router id, higher router id)
+
+    def __repr__(self):
+        """
+            Defines how python should represent a Topology object
+        """
+        return f"Topology({self.name}, {len(self.routers)} routers, {len(self.links)} links)"
+
+    def add_router(self, router_id):
+        """
+            Adds a router with the given id to the topology
+        """
+        self.routers.append(router_id)
+
+    def add_link(self, router_a, router_b, metric=1):
+        """
+            Adds a link with the given metric between the two given routers
+        """
+        self.links[(min(router_a, router_b), max(router_a, router_b))] = metric
+
+    def get_neighbours(self, excluded_routers=(), excluded_links=()):
+        """
+            Returns the neighbours of every router as {router id: {neighbour id: metric}}, leaving out the given routers and links
+        """
+        neighbours = {router_id: {} for router_id in self.routers if router_id not in excluded_routers}
+        for (router_a, router_b), metric in self.links.items():
+            if router_a in neighbours and router_b in neighbours and (router_a, router_b) not in excluded_links:
+                neighbours[router_a][router_b] = metric
+                neighbours[router_b][router_a] = metric
+        return neighbours
+
+    def write_configs(self, directory):
+        """
+            Writes a config file for every router in the topology into the given directory
+            :return: list of the config file paths written
+        """
+        ports = {} # Input port of each (receiving router, sending router) pair
+        port = FIRST_PORT
+        for router_a, router_b in self.links:
+            ports[(router_a, router_b)] = port
+            ports[(router_b, router_a)] = port + 1
+            port += 2
+        if port > 64000:
+            raise Exception("Error: Topology has too many links to give every link its own pair of ports")
+
+        config_filenames = []
+        neighbours = self.get_neighbours()
+        for router_id in self.routers:
+            input_ports = [ports[(router_id, neighbour_id)] for neighbour_id in neighbours[router_id]]
+            outputs = [f"{ports[(neighbour_id, router_id)]}-{metric}-{neighbour_id}" for neighbour_id, metric in neighbours[router_id].items()]
+            if not input_ports:
+                raise Exception(f"Error: Router {router_id} has no links, so it can't be written as a valid config")
+            lines = [
+                f"router-id, {router_id}",
+                "input-ports, " + ", ".join(str(input_port) for input_port in input_ports),
+                "outputs, " + ", ".join(outputs),
+            ]
+            config_filename = os.path.join(directory, f"router{router_id}.txt")
+            with open(config_filename, "w") as config_file:
+                config_file.write("\n".join(lines) + "\n")
+            config_filenames.append(config_filename)
+        return config_filenames
+
+    def expected_metrics(self, excluded_routers=(), excluded_links=()):
+        """
+            Works out the metric every router should converge to for each destination it can reach with a metric below 16
+            :return: {router id: {destination: metric}}
+        """
+        neighbours = self.get_neighbours(excluded_routers, excluded_links)
+        expected = {}
+        for source in neighbours:
+            distances = {source: 0}
+            queue = [(0, source)]
+            while queue:
+                distance, router_id = heapq.heappop(queue)
+                if distance > distances[router_id]:
+                    continue
+                for neighbour_id, metric in neighbours[router_id].items():
+                    new_distance = distance + metric
+                    if new_distance < INFINITY and new_distance < distances.get(neighbour_id, INFINITY):
+                        distances[neighbour_id] = new_distance
+                        heapq.heappush(queue, (new_distance, neighbour_id))
+            del distances[source]
+            expected[source] = distances
+        return expected
+
+
+def line_topology(size):
+    """
+        Routers connected one after the other in a line
+    """
+    topology = Topology(f"line-{size}")
+    for router_id in range(1, size + 1):
+        topology.add_router(router_id)
+        if router_id > 1:
+            topology.add_link(router_id - 1, router_id)
+    return topology
+
+
+def ring_topology(size):
+    """
+        A line of routers with the last router connected back to the first
+    """
+    topology = line_topology(size)
+    topology.name = f"ring-{size}"
+    if size > 2:
+        topology.add_link(size, 1)
+    return topology
+
+
+def grid_topology(size):
+    """
+        Routers laid out in a square grid, each connected to the routers above, below, left and right of it
+    """
+    width = max(1, round(size ** 0.5))
+    topology = Topology(f"grid-{size}")
+    for router_id in range(1, size + 1):
+        topology.add_router(router_id)
+        if (router_id - 1) % width != 0:
+            topology.add_link(router_id - 1, router_id)
+        if router_id > width:
+            topology.add_link(router_id - width, router_id)
+    return topology
+
+
+def star_topology(size):
+    """
+        One central router connected to every other router
+    """
+    topology = Topology(f"star-{size}")
+    for router_id in range(1, size + 1):
+        topology.add_router(router_id)
+        if router_id > 1:
+            topology.add_link(1, router_id)
+    return topology
+
+
+def random_topology(size, extra_links=None, max_metric=4, seed=0):
+    """
+        A random spanning tree with extra random links added, so the topology is always connected
+        :param extra_links: number of links to add on top of the spanning tree, defaults to half the number of routers
+        :param max_metric: link metrics are picked between 1 and this value
+        :param seed: seed for the random number generator so runs are repeatable
+    """
+    generator = random.Random(seed)
+    topology = Topology(f"random-{size}")
+    for router_id in range(1, size + 1):
+        topology.add_router(router_id)
+        if router_id > 1:
+            topology.add_link(generator.randint(1, router_id - 1), router_id, generator.randint(1, max_metric))
+    if extra_links is None:
+        extra_links = size // 2
+    for _ in range(extra_links):
+        router_a, router_b = generator.sample(range(1, size + 1), 2) if size > 1 else (1, 1)
+        if router_a != router_b:
+            topology.add_link(router_a, router_b, generator.randint(1, max_metric))
+    return topology
+
+
+TOPOLOGIES = {
+    "line": line_topology,
+    "ring": ring_topology,
+    "grid": grid_topology,
+    "star": star_topology,
+    "random": random_topology,
+}
@@ -0,0 +1,118 @@
+import random
+
+from Clock import *
+
+
+class TriggeredUpdates:
+    """
+        Coalesces triggered updates as described in section 3.10.1 of RFC 2453. Changed routes are collected in a dirty
+        set and a single triggered update, holding only those routes, is sent after a random 1 to 5 second hold down.
+        Withdrawals skip the hold down, but every triggered update is still spaced a random 1 to 5 seconds after the
+        one before it, so a burst of withdrawals goes out as one update followed by at most one more
+    """
+    def __init__(self, routing_table, min_hold_down=1, max_hold_down=5, clock=SYSTEM_CLOCK, random_source=random):
+        """
+            Initializes the triggered update state and registers it for changes to the routing table
+            :param routing_table: RoutingTable object whose changes should be advertised
+            :param min_hold_down: the shortest time in seconds to wait before sending a triggered update
+            :param max_hold_down: the longest time in seconds to wait before sending a triggered update
+            :param clock: clock the hold down timer is read from
+            :param random_source: random number generator the hold downs are drawn from
+        """
+        self.clock = clock
+        self.random = random_source
+        self.routing_table = routing_table
+        self.dirty = set() # Destinations of the routes that have changed since the last update
+        self.deadline = None # Clock time the pending triggered update is due, None if there isn't one
+        self.earliest_deadline = None # Clock time the next triggered update can go out, spaced from the last one sent
+        self.min_hold_down = min_hold_down
+        self.max_hold_down = max_hold_down
+        self.requested = 0 # Number of times a triggered update was asked for
+        self.sent = 0 # Number of triggered updates actually sent
+        self.suppressed = 0 # Number of requests folded into an already pending update or a periodic update
+        self.routes_sent = 0 # Number of changed routes sent in triggered updates
+        routing_table.add_change_listener(self.mark_dirty)
+
+    def mark_dirty(self, destination):
+        """
+            Records that the route for the given destination has changed. A suppressed route that is reachable is still
+            advertised as unreachable, so there is nothing new to send for it
+        """
+        flap_damping = self.routing_table.flap_damping
+        if flap_damping is not None and flap_damping.is_suppressed(destination):
+            route = self.routing_table.get_route_by_router(destination)
+            if route is not None and route.metric < 16:
+                return
+        self.dirty.add(destination)
+
+    def request(self, now=None, immediate=False):
+        """
+            Asks for a triggered update. Starts the hold down timer unless an update is already pending
+            :param now: the current clock time, read from the clock if not given
+            :param immediate: send the update without waiting for the hold down, for withdrawn routes so neighbours stop
+                using them straight away, as long as it is spaced from the last triggered update. Any other changes
+                pending are sent in the same update
+        """
+        self.requested += 1
+        if now is None:
+            now = self.clock.now()
+        if immediate:
+            deadline = now
+        elif self.deadline is None:
+            deadline = now + self.random.uniform(self.min_hold_down, self.max_hold_down)
+        else:
+            deadline = self.deadline
+        if self.earliest_deadline is not None and deadline < self.earliest_deadline:
+            deadline = self.earliest_deadline
+        if self.deadline is not None:
+            self.suppressed += 1
+            if deadline < self.deadline:
+                self.deadline = deadline
+            return
+        self.deadline = deadline
+
+    def is_due(self, now=None):
+        """
+            Checks if the hold down timer of a pending triggered update has expired
+        """
+        if self.deadline is None:
+            return False
+        if now is None:
+            now = self.clock.now()
+        return now >= self.deadline
+
+    def take_dirty(self, now=None):
+        """
+            Returns the changed destinations in order to send in the triggered update and resets the pending state,
+            holding off the next triggered update for a random 1 to 5 seconds
+        """
+        if now is None:
+            now = self.clock.now()
+        destinations = sorted(self.dirty)
+        self.dirty.clear()
+        self.deadline = None
+        self.earliest_deadline = now + self.random.uniform(self.min_hold_down, self.max_hold_down)
+        self.sent += 1
+        self.routes_sent += len(destinations)
+        return destinations
+
+    def periodic_update_sent(self):
+        """
+            Drops the pending changes because a periodic update has just advertised the whole table
+        """
+        if self.deadline is not None:
+            self.suppressed += 1
+            self.deadline = None
+        self.dirty.clear()
+
+    def get_stats(self):
+        """
+            Returns the triggered update counters as a dictionary
+        """
+        return {
+            "requested": self.requested,
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "routes_sent": self.routes_sent,
+            "pending_routes": len(self.dirty),
+        }